@@ -1,6 +1,14 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Course, ChatMessage, KnowledgeBase
+from django.utils.html import format_html_join
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Length
+from . import caching, chat, search, totals
+from .pagination import EstimatedCountPaginator
+from .models import User, Course, ChatMessage, ArchivedConversation, KnowledgeBase, GradingScale, GradeBand, Semester
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -11,18 +19,115 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('course_name', 'user', 'letter_grade', 'credits')
-    list_filter = ('user',)
+    list_select_related = ('user',)
+    # Searching by owner instead of a sidebar filter listing every user
+    search_fields = ('course_name', '=user__email', '=user__username')
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change:
+            previous = Course.objects.select_for_update().get(pk=obj.pk)
+            totals.apply_changes(previous.user_id, removed=[previous])
+            caching.bump_course_version(previous.user_id)
+        super().save_model(request, obj, form, change)
+        totals.apply_changes(obj.user_id, added=[obj])
+        caching.bump_course_version(obj.user_id)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        # Re-read under a row lock; obj was loaded before the transaction began
+        previous = Course.objects.select_for_update().filter(pk=obj.pk).first()
+        if previous is not None:
+            totals.apply_changes(previous.user_id, removed=[previous])
+            caching.bump_course_version(previous.user_id)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        by_user = {}
+        for course in queryset.select_for_update(of=('self',)):
+            by_user.setdefault(course.user_id, []).append(course)
+        for user_id, courses in by_user.items():
+            totals.apply_changes(user_id, removed=courses)
+            caching.bump_course_version(user_id)
+        super().delete_queryset(request, queryset)
+
+@admin.register(Semester)
+class SemesterAdmin(admin.ModelAdmin):
+    list_display = ('label', 'year', 'term', 'institution')
+    search_fields = ('label',)
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ('role', 'user', 'content_preview', 'created_at')
-    list_filter = ('role', 'created_at', 'user')
-    
+    list_filter = ('role', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('=user__email', '=user__username', '=conversation_id')
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     def content_preview(self, obj):
         return obj.content[:50]
 
+@admin.register(ArchivedConversation)
+class ArchivedConversationAdmin(admin.ModelAdmin):
+    list_display = ('conversation_id', 'user', 'message_count', 'last_message_at', 'codec', 'compressed_size')
+    list_filter = ('codec',)
+    list_select_related = ('user',)
+    search_fields = ('=user__email', '=conversation_id')
+    exclude = ('payload',)
+    readonly_fields = ('user', 'conversation_id', 'message_count', 'first_message_at', 'last_message_at', 'codec', 'archived_at', 'transcript')
+
+    def get_queryset(self, request):
+        # The changelist only shows the blob's size, computed in SQL
+        return super().get_queryset(request).defer('payload').annotate(payload_size=Length('payload'))
+
+    @admin.display(description='compressed size', ordering='payload_size')
+    def compressed_size(self, obj):
+        return obj.payload_size
+
+    def transcript(self, obj):
+        return format_html_join(
+            '', '<p><strong>{}</strong> <small>{}</small><br>{}</p>',
+            ((message.role, message.created_at, message.content) for message in chat.archived_messages(obj)),
+        )
+
 @admin.register(KnowledgeBase)
 class KnowledgeBaseAdmin(admin.ModelAdmin):
     list_display = ('question', 'is_verified', 'created_at')
     search_fields = ('question', 'answer')
     list_filter = ('is_verified',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over question/answer
+        if not search_term:
+            return queryset, False
+        ids = [entry_id for entry_id, _ in search.ranked_ids(search_term, limit=settings.ADMIN_SEARCH_LIMIT)]
+        queryset = queryset.filter(id__in=ids)
+        if ids and ORDER_VAR not in request.GET:
+            # Best match first unless a column header was clicked
+            rank = Case(*[When(id=entry_id, then=Value(position)) for position, entry_id in enumerate(ids)],
+                        output_field=IntegerField())
+            queryset = queryset.order_by(rank)
+        return queryset, False
+
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    extra = 1
+
+@admin.register(GradingScale)
+class GradingScaleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_default', 'updated_at')
+    inlines = [GradeBandInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if form.instance.is_default and (form.has_changed() or any(formset.has_changed() for formset in formsets)):
+            self.message_user(
+                request, 'GPA summaries are computed from course rows until "manage.py rebuild_gpa_totals" rebuilds the stored totals on this scale.',
+                messages.WARNING,
+            )
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from .metrics import install_sql_wrapper
+
+        connection_created.connect(install_sql_wrapper, dispatch_uid='accounts_metrics_sql')
@@ -0,0 +1,140 @@
+"""
+Async versions of the hot read endpoints, for ASGI deployments.
+
+Enabled with ``ASYNC_VIEWS=True`` (see accounts/urls.py). They return the
+same payloads as their DRF counterparts in views.py but authenticate with
+``CachedJWTAuthentication.aauthenticate`` and read through the async ORM
+and cache APIs, so an ASGI worker keeps serving other connections while a
+request waits on the database or on a slow client.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import caching, grading, totals
+from .authentication import CachedJWTAuthentication
+from .gpa import transcript_gpa
+from .models import Course
+from .pagination import OptInCursorPagination
+from .serializers import CourseSerializer
+from .views import CourseViewSet
+
+authenticator = CachedJWTAuthentication()
+_create_course = sync_to_async(CourseViewSet.as_view({'post': 'create'}))
+
+
+def _error(exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request=None)
+    return response
+
+
+def _unknown_scale():
+    return JsonResponse({'success': False, 'error': 'Unknown grading scale'}, status=400)
+
+
+async def _authenticate(request, required):
+    """Set ``request.user``; raise NotAuthenticated if required and missing."""
+    result = await authenticator.aauthenticate(request)
+    request.user = result[0] if result else AnonymousUser()
+    if required and not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+
+
+def _default_permissions_require_auth(request):
+    # Mirrors the DRF views, which fall back to DEFAULT_PERMISSION_CLASSES
+    return not all(permission().has_permission(request, None) for permission in api_settings.DEFAULT_PERMISSION_CLASSES)
+
+
+@require_GET
+async def health_check(request):
+    return JsonResponse({'status': 'ok'})
+
+
+@csrf_exempt
+@require_POST
+async def calculate_gpa_endpoint(request):
+    try:
+        await _authenticate(request, required=False)
+        if _default_permissions_require_auth(request):
+            raise exceptions.NotAuthenticated()
+        data = json.loads(request.body or b'{}')
+    except exceptions.APIException as exc:
+        return _error(exc)
+    except ValueError as exc:
+        return JsonResponse({'detail': f'JSON parse error - {exc}'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'error': 'Invalid data'}, status=400)
+
+    try:
+        scale = await grading.aget_scale(data.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    try:
+        result = transcript_gpa(data.get('grades', []), data.get('credits', []), scale)
+        return JsonResponse(result, status=200 if result['success'] else 400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+async def _course_list_data(request):
+    queryset = Course.objects.filter(user=request.user).order_by('-id')
+    paginator = OptInCursorPagination()
+    if paginator.cursor_query_param in request.GET or paginator.page_size_query_param in request.GET:
+        # Cursor encoding lives in DRF's sync paginator; run it off the event loop
+        def page():
+            drf_request = Request(request)
+            results = paginator.paginate_queryset(queryset, drf_request)
+            return paginator.get_paginated_response(CourseSerializer(results, many=True).data).data
+        return await sync_to_async(page)()
+    return CourseSerializer([course async for course in queryset], many=True).data
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'HEAD', 'POST'])
+async def course_list(request):
+    if request.method == 'POST':
+        return await _create_course(request)
+    try:
+        await _authenticate(request, required=True)
+    except exceptions.APIException as exc:
+        return _error(exc)
+
+    # Same ETag, Last-Modified and cache entries as CourseViewSet.list
+    version, modified = await caching.acourse_version(request.user.id)
+    etag = caching.course_list_etag(request, version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = await caching.aget_course_list(request, version)
+        if data is None:
+            data = await _course_list_data(request)
+            await caching.aset_course_list(request, version, data)
+        response = JsonResponse(data, safe=False)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+async def course_summary(request):
+    try:
+        await _authenticate(request, required=True)
+    except exceptions.APIException as exc:
+        return _error(exc)
+    try:
+        scale = await grading.aget_scale(request.GET.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    return JsonResponse(await totals.aread_summary(request.user, scale))
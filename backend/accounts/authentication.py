@@ -0,0 +1,112 @@
+"""
+JWT authentication that resolves users from the cache instead of a query.
+
+The fields needed to authenticate a user are cached under their id plus a
+per-user version stamp. ``User.save`` and ``User.delete`` bump the stamp
+once the transaction commits, so a deactivated, deleted or re-passworded
+user is never served from a stale entry. ``QuerySet.update`` bypasses
+``save``; call ``invalidate_user`` after bulk updates to users.
+"""
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import aget_stamp, bump_stamp, get_stamp
+
+CACHED_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _version_key(user_id):
+    return f'auth:user:version:{user_id}'
+
+
+def user_version(user_id):
+    return get_stamp(_version_key(user_id))
+
+
+async def auser_version(user_id):
+    return await aget_stamp(_version_key(user_id))
+
+
+def invalidate_user(user_id):
+    """Drop a user's cached authentication entry after the current transaction commits."""
+    transaction.on_commit(lambda: bump_stamp(_version_key(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` whose user lookup is served from the cache."""
+
+    def _lookup(self, user_id):
+        return self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*CACHED_FIELDS, 'password')
+
+    @staticmethod
+    def _to_entry(row):
+        if row is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        # Only a digest of the password hash is kept, for CHECK_REVOKE_TOKEN
+        return {**row, 'password': get_md5_hash_password(row['password'])}
+
+    def _to_user(self, entry, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not entry['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['password']:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        # from_db marks the instance as loaded and expects values in concrete field order;
+        # other fields are fetched on access
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in CACHED_FIELDS]
+        return self.user_model.from_db('default', names, [entry[name] for name in names])
+
+    @staticmethod
+    def _user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as exc:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from exc
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        key = f'auth:user:{user_id}:{user_version(user_id)}'
+        entry = cache.get(key)
+        if entry is None:
+            entry = self._to_entry(self._lookup(user_id).first())
+            cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+        return self._to_user(entry, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        key = f'auth:user:{user_id}:{await auser_version(user_id)}'
+        entry = await cache.aget(key)
+        if entry is None:
+            entry = self._to_entry(await self._lookup(user_id).afirst())
+            await cache.aset(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+        return self._to_user(entry, validated_token)
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async Django views; token checks are CPU-only."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Accepts ``Authorization: Bearer <METRICS_TOKEN>`` so Prometheus can scrape without a user."""
+
+    def authenticate(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if settings.METRICS_TOKEN and constant_time_compare(header, f'Bearer {settings.METRICS_TOKEN}'):
+            return AnonymousUser(), 'metrics'
+        return None
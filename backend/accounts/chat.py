@@ -0,0 +1,171 @@
+"""
+Chat history reads, backed by the (user, conversation_id, created_at, id) index.
+
+Pages are keyset based: a page ends just before a given message, so each
+request is an index range scan no matter how deep into history it reaches.
+Conversations compacted into ArchivedConversation blobs (see the
+``archive_chat_messages`` command) are read back transparently; archived
+messages are always older than any hot message in the same conversation.
+Each archive records the id range of its messages, so a page anchored in cold
+storage only decompresses the archives it actually reads.
+"""
+import json
+import lzma
+import zlib
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedConversation, ChatMessage
+from .serializers import ChatMessageSerializer
+
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+ARCHIVED_FIELDS = ('id', 'conversation_id', 'role', 'content', 'context', 'created_at')
+
+
+class MessageNotFound(Exception):
+    pass
+
+
+# --- Cold storage ---
+
+def archive_conversation(user_id, conversation_id, codec='zlib', batch_size=1000, cutoff=None):
+    """
+    Move the hot messages of a conversation created up to ``cutoff`` (all of
+    them when None) into one compressed archive row.
+
+    Returns the number of messages archived.
+    """
+    compress = CODECS[codec][0]
+    hot = ChatMessage.objects.filter(user_id=user_id, conversation_id=conversation_id)
+    if cutoff is not None:
+        # Messages that arrived after the caller's idle check stay hot
+        hot = hot.filter(created_at__lte=cutoff)
+    with transaction.atomic():
+        messages = list(
+            hot
+            .select_for_update()
+            .order_by('created_at', 'id')
+            .values(*ARCHIVED_FIELDS)
+        )
+        if not messages:
+            return 0
+        payload = [{**message, 'created_at': message['created_at'].isoformat()} for message in messages]
+        ids = [message['id'] for message in messages]
+        ArchivedConversation.objects.create(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            message_count=len(messages),
+            first_message_at=messages[0]['created_at'],
+            last_message_at=messages[-1]['created_at'],
+            min_message_id=min(ids),
+            max_message_id=max(ids),
+            codec=codec,
+            payload=compress(json.dumps(payload, separators=(',', ':')).encode()),
+        )
+        for start in range(0, len(ids), batch_size):
+            ChatMessage.objects.filter(id__in=ids[start:start + batch_size]).delete()
+    return len(messages)
+
+
+def archived_messages(archive):
+    """Unsaved ChatMessage instances for an archive, oldest first."""
+    decompress = CODECS[archive.codec][1]
+    messages = json.loads(decompress(bytes(archive.payload)))
+    return [
+        ChatMessage(user_id=archive.user_id, **{**message, 'created_at': parse_datetime(message['created_at'])})
+        for message in messages
+    ]
+
+
+# --- Reads ---
+
+def conversations(user, limit):
+    """Most recently active conversations, hot or archived, with their message counts."""
+    hot = ChatMessage.objects.filter(user=user).values('conversation_id')
+    cold = ArchivedConversation.objects.filter(user=user).values('conversation_id')
+    hot_top = hot.annotate(message_count=Count('id'), last_message_at=Max('created_at')).order_by('-last_message_at')
+    cold_top = cold.annotate(message_count=Sum('message_count'), last_message_at=Max('last_message_at')).order_by('-last_message_at')
+
+    merged = {}
+    for row in list(hot_top[:limit]) + list(cold_top[:limit]):
+        current = merged.get(row['conversation_id'])
+        if current is None or row['last_message_at'] > current['last_message_at']:
+            merged[row['conversation_id']] = {**row, 'message_count': 0}
+    rows = sorted(merged.values(), key=lambda row: row['last_message_at'], reverse=True)[:limit]
+
+    # Counts must include both sources even when only one made its top list
+    ids = [row['conversation_id'] for row in rows]
+    counts = {}
+    for source in (hot.filter(conversation_id__in=ids).annotate(n=Count('id')),
+                   cold.filter(conversation_id__in=ids).annotate(n=Sum('message_count'))):
+        for row in source.order_by():
+            counts[row['conversation_id']] = counts.get(row['conversation_id'], 0) + row['n']
+    for row in rows:
+        row['message_count'] = counts.get(row['conversation_id'], 0)
+    return rows
+
+
+def _opened(archive, opened):
+    """``archived_messages`` decompressed at most once per request, keyed by archive id."""
+    if archive.id not in opened:
+        opened[archive.id] = archived_messages(archive)
+    return opened[archive.id]
+
+
+def _find_archived(archives, message_id, opened):
+    # Only archives whose id range covers the message are opened, normally just one
+    for archive in archives.filter(min_message_id__lte=message_id, max_message_id__gte=message_id).defer(None):
+        for message in _opened(archive, opened):
+            if message.id == message_id:
+                return message.created_at
+    return None
+
+
+def conversation_page(user, conversation_id, before, limit):
+    """
+    Return ``(messages, next_before)`` for one conversation.
+
+    ``messages`` are the ``limit`` messages preceding message ``before`` (or the
+    latest ones) in chronological order; ``next_before`` is the id to pass to
+    fetch the previous page, or None at the start of the conversation.
+    """
+    queryset = ChatMessage.objects.filter(user=user, conversation_id=conversation_id)
+    # Payloads are only loaded for the archives a page actually reads
+    archives = (
+        ArchivedConversation.objects.filter(user=user, conversation_id=conversation_id)
+        .defer('payload').order_by('-last_message_at')
+    )
+    opened = {}
+    anchor = None
+    if before is not None:
+        created_at = queryset.filter(id=before).values_list('created_at', flat=True).first()
+        if created_at is None:
+            created_at = _find_archived(archives, before, opened)
+        if created_at is None:
+            raise MessageNotFound(before)
+        anchor = (created_at, before)
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=before)
+
+    page = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+    if len(page) <= limit:
+        # Hot rows are exhausted; continue into the archived segments
+        if anchor is not None:
+            archives = archives.filter(first_message_at__lte=anchor[0])
+        for archive in archives:
+            older = [
+                message for message in reversed(_opened(archive, opened))
+                if anchor is None or (message.created_at, message.id) < anchor
+            ]
+            page.extend(older[:limit + 1 - len(page)])
+            if len(page) > limit:
+                break
+
+    has_more = len(page) > limit
+    page = page[:limit][::-1]
+    next_before = page[0].id if has_more else None
+    return ChatMessageSerializer(page, many=True).data, next_before
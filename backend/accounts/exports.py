@@ -0,0 +1,71 @@
+"""
+Streaming transcript export for a user's courses in CSV or NDJSON.
+
+Rows are pulled with ``QuerySet.iterator`` in chronological semester order
+and encoded one at a time, so memory use stays flat regardless of
+transcript size. Optional semester subtotals are accumulated on the
+requested grading scale while streaming.
+"""
+import csv
+import json
+
+from .gpa import summarize
+from .totals import CHRONOLOGICAL, course_contribution
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+FIELDS = ('id', 'course_name', 'credits', 'letter_grade', 'semester_year')
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _records(queryset, subtotals, chunk_size, scale):
+    """Yield ``('course', row)`` and, if requested, ``('subtotal'|'total', data)`` records."""
+    rows = queryset.order_by(*CHRONOLOGICAL, 'id').values_list(*FIELDS, 'semester_id', 'semester__label', named=True).iterator(chunk_size=chunk_size)
+    if not subtotals:
+        for row in rows:
+            yield 'course', row
+        return
+
+    semesters = []
+    current = None
+    for row in rows:
+        if current is None or row.semester_id != current['semester_id']:
+            if current is not None:
+                yield 'subtotal', summarize([current])['semesters'][0]
+                semesters.append(current)
+            current = {'semester_id': row.semester_id, 'semester_year': row.semester__label, 'points': 0, 'credits': 0, 'courses': 0}
+        points, credits = course_contribution(row, scale)
+        current['points'] += points
+        current['credits'] += credits
+        current['courses'] += 1
+        yield 'course', row
+    if current is not None:
+        yield 'subtotal', summarize([current])['semesters'][0]
+        semesters.append(current)
+    summary = summarize(semesters)
+    yield 'total', {key: summary[key] for key in ('cgpa', 'total_credits', 'course_count')}
+
+
+def stream_csv(queryset, subtotals, chunk_size, scale):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS + ('gpa',) if subtotals else FIELDS)
+    for kind, record in _records(queryset, subtotals, chunk_size, scale):
+        if kind == 'course':
+            yield writer.writerow(record[:len(FIELDS)])
+        elif kind == 'subtotal':
+            yield writer.writerow(['', 'Semester subtotal', record['total_credits'], '', record['semester_year'], record['gpa']])
+        else:
+            yield writer.writerow(['', 'Cumulative', record['total_credits'], '', '', record['cgpa']])
+
+
+def stream_ndjson(queryset, subtotals, chunk_size, scale):
+    for kind, record in _records(queryset, subtotals, chunk_size, scale):
+        if kind == 'course':
+            record = {field: getattr(record, field) for field in FIELDS} | {'credits': float(record.credits)}
+        if subtotals:
+            record = {'type': kind, **record}
+        yield json.dumps(record) + '\n'
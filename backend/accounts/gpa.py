@@ -0,0 +1,227 @@
+import hashlib
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+from types import MappingProxyType
+
+import numpy as np
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Trim, Upper
+
+# --- Grade Scale ---
+# Built-in 5.0 scale, used until a default GradingScale is configured
+GRADE_POINTS = {'A': 5.0, 'B': 4.0, 'C': 3.0, 'D': 2.0, 'E': 1.0, 'F': 0.0}
+
+
+def normalize_grade(grade):
+    return str(grade).upper().strip()
+
+
+class GradeScale:
+    """
+    Immutable lookup tables compiled from one grading scale.
+
+    ``points`` maps every accepted grade code to its grade points. Bands with
+    a ``min_percent`` also accept whole percentage marks, which are expanded
+    into the codes ``'0'`` to ``'100'`` at compile time so that every lookup
+    is a plain dict or ``np.searchsorted`` probe.
+    """
+
+    def __init__(self, id, name, bands):
+        self.id = id
+        self.name = name
+        # (grade, points, min_percent) as configured, for display
+        self.bands = tuple((normalize_grade(grade), Decimal(str(points)), min_percent) for grade, points, min_percent in bands)
+        points = {grade: value for grade, value, _ in self.bands}
+        cutoffs = sorted((Decimal(str(min_percent)), value) for _, value, min_percent in self.bands if min_percent is not None)
+        minimums = [cutoff for cutoff, _ in cutoffs]
+        for mark in range(101):
+            index = bisect_right(minimums, mark)
+            if index:
+                points.setdefault(str(mark), cutoffs[index - 1][1])
+        self.points = MappingProxyType(points)
+        # Identifies the effective grade points, which is all that stored totals depend on
+        self.fingerprint = hashlib.sha1(repr(sorted((code, str(value.normalize())) for code, value in points.items())).encode()).hexdigest()
+        self.float_points = MappingProxyType({grade: float(value) for grade, value in points.items()})
+        self.max_points = max(points.values(), default=Decimal(0))
+        # Sorted lookup arrays so grade codes can be mapped with np.searchsorted
+        self._codes = np.array(sorted(points), dtype=str)
+        self._values = np.array([self.float_points[code] for code in self._codes], dtype=float)
+        self._codes.flags.writeable = self._values.flags.writeable = False
+
+    def __repr__(self):
+        return f'<GradeScale {self.id}: {self.name}>'
+
+    def grade_points(self, grades):
+        """Map an array of raw grade strings to (points, valid) arrays."""
+        codes = np.char.strip(np.char.upper(np.asarray(grades, dtype=str)))
+        if not len(self._codes):
+            return np.zeros(codes.shape), np.zeros(codes.shape, dtype=bool)
+        idx = np.searchsorted(self._codes, codes)
+        idx[idx == len(self._codes)] = 0
+        valid = self._codes[idx] == codes
+        return np.where(valid, self._values[idx], 0.0), valid
+
+
+BUILTIN_SCALE = GradeScale(None, '5.0', [(grade, points, None) for grade, points in GRADE_POINTS.items()])
+
+
+def _credits_array(credits):
+    try:
+        values = np.asarray(credits, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    if values.ndim != 1 or not np.isfinite(values).all():
+        return None
+    return values
+
+
+def _scalars(values):
+    return isinstance(values, list) and all(isinstance(value, (str, int, float)) for value in values)
+
+
+def transcript_gpa(grades, credits, scale):
+    """
+    Result payload of ``calculate_gpa_endpoint`` for one transcript on ``scale``.
+
+    Validated exactly as one ``batch_gpa`` transcript: unknown grades are
+    skipped, and malformed, infinite or NaN credits, or totals that overflow,
+    are rejected with ``Invalid credits``.
+    """
+    return batch_gpa([{'grades': grades, 'credits': credits}], scale)[0]
+
+
+def batch_gpa(transcripts, scale):
+    """
+    Compute the GPA of many transcripts on ``scale`` in one pass.
+
+    Each transcript is a dict with the same ``grades``/``credits`` lists that
+    ``calculate_gpa_endpoint`` accepts. All grades are flattened into a single
+    array, mapped to points through a lookup table and summed per transcript
+    with ``np.bincount``. Returns one result dict per transcript, in order.
+    """
+    results = [None] * len(transcripts)
+    owners, lengths, grades, credits = [], [], [], []
+
+    for index, transcript in enumerate(transcripts):
+        if not isinstance(transcript, dict):
+            results[index] = {'success': False, 'error': 'Invalid data'}
+            continue
+        t_grades = transcript.get('grades')
+        t_credits = transcript.get('credits')
+        # Nested values would make the flattened arrays ragged and fail the whole batch
+        if not _scalars(t_grades) or not _scalars(t_credits) or not t_grades or len(t_grades) != len(t_credits):
+            results[index] = {'success': False, 'error': 'Invalid data'}
+            continue
+        owners.append(index)
+        lengths.append(len(t_grades))
+        grades.extend(t_grades)
+        credits.extend(t_credits)
+
+    if owners:
+        credit_values = _credits_array(credits)
+        if credit_values is None:
+            # Fall back to per-transcript conversion to isolate the bad rows
+            bounds = np.cumsum([0] + lengths)
+            chunks = [_credits_array(credits[bounds[i]:bounds[i + 1]]) for i in range(len(owners))]
+            keep = [i for i, chunk in enumerate(chunks) if chunk is not None]
+            for i, chunk in enumerate(chunks):
+                if chunk is None:
+                    results[owners[i]] = {'success': False, 'error': 'Invalid credits'}
+            grades = [g for i in keep for g in grades[bounds[i]:bounds[i + 1]]]
+            credit_values = np.concatenate([chunks[i] for i in keep]) if keep else np.empty(0)
+            owners = [owners[i] for i in keep]
+            lengths = [lengths[i] for i in keep]
+
+        if owners:
+            points, valid = scale.grade_points(grades)
+            segments = np.repeat(np.arange(len(owners)), lengths)
+            graded_credits = np.where(valid, credit_values, 0.0)
+            # Huge credits overflow to inf, which can't be rendered as JSON
+            with np.errstate(over='ignore', invalid='ignore'):
+                total_points = np.bincount(segments, weights=points * graded_credits, minlength=len(owners))
+                total_credits = np.bincount(segments, weights=graded_credits, minlength=len(owners))
+
+            for owner, t_points, t_credits in zip(owners, total_points.tolist(), total_credits.tolist()):
+                if not (math.isfinite(t_points) and math.isfinite(t_credits)):
+                    results[owner] = {'success': False, 'error': 'Invalid credits'}
+                elif t_credits == 0:
+                    results[owner] = {'success': False, 'error': 'No credits'}
+                else:
+                    results[owner] = {'success': True, 'gpa': round(t_points / t_credits, 2), 'total_credits': t_credits}
+
+    for index, transcript in enumerate(transcripts):
+        if isinstance(transcript, dict) and 'id' in transcript:
+            results[index] = {'id': transcript['id'], **results[index]}
+    return results
+
+
+def aggregate_courses(queryset, scale, group_by=('semester_id',)):
+    """
+    Per-semester grade point and credit totals for a Course queryset on ``scale``.
+
+    Runs a single grouped query; grades are normalized the same way the
+    calculator endpoint does and unknown grades contribute nothing.
+    """
+    decimal = DecimalField(max_digits=14, decimal_places=3)
+    codes_by_value = defaultdict(list)
+    for code, value in scale.points.items():
+        codes_by_value[value].append(code)
+    graded = When(grade__in=list(scale.points), then=F('credits'))
+    points = [
+        When(grade__in=codes, then=F('credits') * Value(value, output_field=decimal))
+        for value, codes in codes_by_value.items()
+    ]
+    return (
+        queryset
+        .annotate(grade=Upper(Trim('letter_grade')))
+        .values(*group_by)
+        .annotate(
+            points=Sum(Case(*points, default=Value(Decimal(0)), output_field=decimal)),
+            credits=Sum(Case(graded, default=Value(Decimal(0)), output_field=decimal)),
+            courses=Count('id'),
+        )
+        .order_by(*group_by)
+    )
+
+
+def _gpa(points, credits):
+    return round(float(points) / float(credits), 2) if credits else None
+
+
+def summarize(rows):
+    """Build the CGPA summary payload from per-semester total rows."""
+    semesters = []
+    total_points = total_credits = total_courses = 0
+    for row in rows:
+        total_points += row['points']
+        total_credits += row['credits']
+        total_courses += row['courses']
+        semesters.append({
+            'semester_year': row['semester_year'],
+            'gpa': _gpa(row['points'], row['credits']),
+            'total_credits': float(row['credits']),
+            'course_count': row['courses'],
+        })
+    return {
+        'cgpa': _gpa(total_points, total_credits),
+        'total_credits': float(total_credits),
+        'course_count': total_courses,
+        'semesters': semesters,
+    }
+
+
+def trajectory(rows):
+    """Build the CGPA trajectory payload from chronological rows carrying cumulative totals."""
+    return {
+        'trajectory': [
+            {
+                'semester_year': row['semester_year'],
+                'gpa': _gpa(row['points'], row['credits']),
+                'cgpa': _gpa(row['cumulative_points'], row['cumulative_credits']),
+                'total_credits': float(row['cumulative_credits']),
+            }
+            for row in rows
+        ],
+    }
@@ -0,0 +1,110 @@
+"""
+Per-process registry of compiled grading scales.
+
+GradingScale and GradeBand rows are compiled into immutable ``GradeScale``
+lookup tables (see gpa.py) once and reused by every request. Saving or
+deleting a scale or band bumps a shared version stamp after the transaction
+commits; each process rechecks the stamp at most every
+``GRADING_SCALE_RECHECK`` seconds and recompiles only when it moved. Until a
+default scale is configured the built-in 5.0 scale is used.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .caching import bump_stamp, get_stamp
+from .gpa import BUILTIN_SCALE, GradeScale
+from .models import GradingScale
+
+VERSION_KEY = 'grading:version'
+
+
+class UnknownScale(Exception):
+    pass
+
+
+class _Registry:
+    def __init__(self, version, scales, default):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.scales = scales
+        self.default = default
+        # Every grade accepted by at least one scale, for validating stored courses
+        self.grades = frozenset(code for scale in (default, *scales.values()) for code in scale.points)
+
+    def fresh(self):
+        return time.monotonic() - self.checked_at < settings.GRADING_SCALE_RECHECK
+
+
+_registry = None
+
+
+def _compile():
+    scales, default = {}, BUILTIN_SCALE
+    for row in GradingScale.objects.prefetch_related('bands'):
+        scale = GradeScale(row.id, row.name, [(band.grade, band.points, band.min_percent) for band in row.bands.all()])
+        scales[row.id] = scale
+        if row.is_default:
+            default = scale
+    return scales, default
+
+
+def _current():
+    global _registry
+    registry = _registry
+    if registry is not None and registry.fresh():
+        return registry
+    version = get_stamp(VERSION_KEY)
+    if registry is not None and registry.version == version:
+        registry.checked_at = time.monotonic()
+        return registry
+    registry = _registry = _Registry(version, *_compile())
+    return registry
+
+
+def _resolve(registry, scale_id):
+    if scale_id is None or scale_id == '':
+        return registry.default
+    try:
+        return registry.scales[int(scale_id)]
+    except (KeyError, TypeError, ValueError):
+        raise UnknownScale(scale_id)
+
+
+def get_scale(scale_id=None):
+    """The compiled scale with id ``scale_id``, or the default scale. Raises UnknownScale."""
+    return _resolve(_current(), scale_id)
+
+
+async def aget_scale(scale_id=None):
+    registry = _registry
+    if registry is not None and registry.fresh():
+        return _resolve(registry, scale_id)
+    return await sync_to_async(get_scale)(scale_id)
+
+
+def all_scales():
+    registry = _current()
+    return sorted(registry.scales.values(), key=lambda scale: scale.name) or [registry.default]
+
+
+def known_grades():
+    return _current().grades
+
+
+def clear():
+    """Drop this process's compiled scales; the next lookup recompiles them."""
+    global _registry
+    _registry = None
+
+
+def _bump():
+    clear()
+    bump_stamp(VERSION_KEY)
+
+
+def invalidate_scales():
+    """Recompile the scales in every process once the current transaction commits."""
+    transaction.on_commit(_bump)
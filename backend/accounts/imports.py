@@ -0,0 +1,94 @@
+"""
+Streaming bulk import of Course rows from CSV or NDJSON uploads.
+
+Rows are read lazily from the uploaded file, validated with the
+CourseSerializer rules and written with bulk_create in batches, so memory
+use depends on the batch size rather than the size of the upload.
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from rest_framework import serializers
+
+from . import totals
+from .models import Course, Semester
+from .serializers import CourseSerializer
+
+FORMATS = ('csv', 'ndjson')
+
+
+def detect_format(upload, requested=None):
+    if requested:
+        return requested.lower() if requested.lower() in FORMATS else None
+    name = (upload.name or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def read_rows(upload, file_format):
+    """Yield ``(line_number, row, parse_error)`` for each record in an uploaded file."""
+    text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, {'non_field_errors': ['Invalid JSON']}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, {'non_field_errors': ['Expected a JSON object']}
+            continue
+        yield line_number, row, None
+
+
+def import_courses(user, rows, batch_size):
+    """
+    Validate and insert rows for ``user``; the caller provides the transaction.
+
+    Returns ``(created, failed, errors)`` where ``errors`` holds at most
+    ``COURSE_IMPORT_MAX_ERRORS`` per-row reports.
+    """
+    # One serializer instance avoids re-building its fields for every row
+    serializer = CourseSerializer()
+    created = failed = 0
+    errors = []
+    batch = []
+    semesters = {}
+
+    def flush():
+        Course.objects.bulk_create(batch)
+        totals.apply_changes(user.id, added=batch)
+        batch.clear()
+
+    for line_number, row, error in rows:
+        if error is None:
+            try:
+                data = serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                error = exc.detail
+        if error is not None:
+            failed += 1
+            if len(errors) < settings.COURSE_IMPORT_MAX_ERRORS:
+                errors.append({'row': line_number, 'errors': error})
+            continue
+        name = data.get('semester_year')
+        if name not in semesters:
+            semesters[name] = Semester.objects.resolve(name)
+        batch.append(Course(user=user, semester=semesters[name], **data))
+        created += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return created, failed, errors
@@ -0,0 +1,84 @@
+"""
+Exact and normalized KnowledgeBase lookups through ``question_hash``.
+
+Verified answers are served from a small per-process LRU first, then the
+shared cache, then the database. Saving or deleting an entry evicts its
+hash from both; the LRU entries also expire after a short TTL so other
+processes pick up changes made elsewhere.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import KnowledgeBase, question_digest
+
+# Cached for unknown or unverified questions so repeats don't reach the database
+_MISSING = ''
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[1] < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+answers = LRUCache(settings.KNOWLEDGE_ANSWER_LRU_SIZE, settings.KNOWLEDGE_ANSWER_LRU_TTL)
+
+
+def _cache_key(digest):
+    return f'kb:answer:{digest}'
+
+
+def verified_answer(text):
+    """The verified answer for ``text`` (or an equivalent wording), or None."""
+    digest = question_digest(text)
+    answer = answers.get(digest)
+    if answer is None:
+        answer = cache.get(_cache_key(digest))
+        if answer is None:
+            answer = (
+                KnowledgeBase.objects.filter(question_hash=digest, is_verified=True)
+                .values_list('answer', flat=True).first()
+            ) or _MISSING
+            cache.set(_cache_key(digest), answer, settings.KNOWLEDGE_ANSWER_CACHE_TIMEOUT)
+        answers.set(digest, answer)
+    return answer or None
+
+
+def invalidate_answer(*digests):
+    for digest in filter(None, digests):
+        answers.pop(digest)
+        cache.delete(_cache_key(digest))
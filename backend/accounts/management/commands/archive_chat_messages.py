@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts import chat
+from accounts.models import ChatMessage
+
+
+class Command(BaseCommand):
+    help = 'Compact chat conversations idle for longer than a cutoff into compressed archive rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+                            help='Archive conversations whose latest message is older than this.')
+        parser.add_argument('--codec', choices=sorted(chat.CODECS), default='zlib')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Hot rows deleted per DELETE statement.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        idle = (
+            ChatMessage.objects.values('user_id', 'conversation_id')
+            .annotate(last_message_at=Max('created_at'))
+            .filter(last_message_at__lt=cutoff)
+            .order_by()
+        )
+        # Materialized up front: archiving deletes rows from the table being grouped
+        idle = list(idle.values_list('user_id', 'conversation_id'))
+        conversations, messages = len(idle), 0
+        if not options['dry_run']:
+            for user_id, conversation_id in idle:
+                messages += chat.archive_conversation(user_id, conversation_id, options['codec'], options['batch_size'], cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{conversations} conversations idle since {cutoff:%Y-%m-%d} would be archived')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Archived {messages} messages from {conversations} conversations'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounts import tfidf
+
+
+class Command(BaseCommand):
+    help = 'Build the TF-IDF nearest-question index over verified KnowledgeBase entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild from scratch instead of adding rows created since the last build.')
+
+    def handle(self, *args, **options):
+        added, total = tfidf.build(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {added} new questions ({total} total)'))
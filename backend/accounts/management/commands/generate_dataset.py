@@ -0,0 +1,207 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import product
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import grading
+from accounts.models import ChatMessage, Course, KnowledgeBase, Semester, SemesterGpaTotals, User, UserGpaTotals, question_digest
+from accounts.totals import course_contribution
+
+# Rough shape of a real student body
+GRADE_WEIGHTS = {'A': 18, 'B': 27, 'C': 28, 'D': 14, 'E': 6, 'F': 7}
+CREDIT_WEIGHTS = {1: 10, 2: 25, 3: 45, 4: 15, 6: 5}
+DEPARTMENTS = ('MTH', 'PHY', 'CHM', 'BIO', 'CSC', 'GST', 'ECO', 'ENG', 'STA', 'ACC', 'SOC', 'PHL')
+CHAT_CONTEXTS = ('general', 'gpa', 'study', 'exam')
+QUESTION_TEMPLATES = (
+    'How do I {} {}?', 'What is the best way to {} {}?', 'Can I {} {} this semester?', 'Why should I {} {}?',
+    'When is the deadline to {} {}?', 'Who approves requests to {} {}?',
+)
+QUESTION_VERBS = ('calculate', 'improve', 'register for', 'drop', 'retake', 'appeal', 'check', 'prepare for')
+QUESTION_TOPICS = (
+    'my GPA', 'my CGPA', 'a failed course', 'carry-over courses', 'the exam timetable', 'a transcript',
+    'elective courses', 'a grade appeal', 'extra credit units', 'the final year project', 'course registration',
+    'a semester break', 'probation', 'scholarship renewal', 'graduation requirements', 'a course waiver',
+)
+USER_MESSAGES = (
+    'What GPA do I need next semester to reach {target:.1f}?', 'Explain how {units} credit units affect my CGPA.',
+    'Give me a study plan for {course}.', 'Is a {grade} in {course} a bad result?', 'Summarize what I got wrong in {course}.',
+)
+AI_MESSAGES = (
+    'Your GPA is the credit-weighted average of your grade points.', 'Focus on the courses with the most credit units first.',
+    'Here is a plan: review notes daily, practice past questions, and rest before the exam.',
+    'A single grade rarely decides your class of degree; consistency matters more.',
+)
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+@contextmanager
+def _keep_timestamps(*fields):
+    """Let bulk_create store explicit values in auto_now_add fields."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, deterministic synthetic dataset of users, courses, chat history and knowledge base entries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Users to create (100000 gives several million rows).')
+        parser.add_argument('--knowledge', type=int, default=2000, help='KnowledgeBase entries to create.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create.')
+        parser.add_argument('--prefix', default='synthetic', help='Username/email prefix of the generated users.')
+        parser.add_argument('--password', default='synthetic-pass', help='Password of every generated user (hashed once).')
+        parser.add_argument('--snapshot', help='Also write a standalone SQLite copy of the database to this path.')
+
+    def handle(self, *args, **options):
+        if options['snapshot'] and connection.vendor != 'sqlite':
+            raise CommandError('--snapshot is only supported on SQLite')
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Users prefixed '{options['prefix']}-' already exist; pick another --prefix")
+
+        seed = options['seed']
+        self.batch_size = options['batch_size']
+        self.scale = grading.get_scale()
+        self.semesters = {}
+        # Dates are relative to today; everything else depends only on the seed
+        self.now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        started = time.monotonic()
+        counts = {'users': 0, 'courses': 0, 'messages': 0, 'knowledge': 0}
+
+        password = make_password(options['password'])
+        chunk = max(self.batch_size // 40, 1)
+        with _keep_timestamps(ChatMessage._meta.get_field('created_at'), KnowledgeBase._meta.get_field('created_at')):
+            for start in range(0, options['users'], chunk):
+                # One generator per user keeps the rows independent of --batch-size
+                rngs = [random.Random(f'{seed}:{n}') for n in range(start, min(start + chunk, options['users']))]
+                with transaction.atomic():
+                    users = User.objects.bulk_create([
+                        User(username=f"{options['prefix']}-{n:07}", email=f"{options['prefix']}-{n:07}@example.test",
+                             password=password, date_joined=self.now - timedelta(days=rng.randint(0, 5 * 365)))
+                        for n, rng in enumerate(rngs, start)
+                    ], batch_size=self.batch_size)
+                    counts['courses'] += self._courses(zip(rngs, users))
+                    counts['messages'] += self._messages(zip(rngs, users))
+                counts['users'] += len(users)
+                self.stdout.write(f"{counts['users']} users, {counts['courses']} courses, {counts['messages']} messages")
+            with transaction.atomic():
+                counts['knowledge'] = self._knowledge(random.Random(f'{seed}:knowledge'), options['knowledge'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['courses']} courses, {counts['messages']} chat messages and "
+            f"{counts['knowledge']} knowledge base entries in {time.monotonic() - started:.1f}s"
+        ))
+        if options['snapshot']:
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM INTO %s', [options['snapshot']])
+            self.stdout.write(f"SQLite snapshot written to {options['snapshot']}")
+
+    def _flush(self, model, rows, force=False):
+        if rows and (force or len(rows) >= self.batch_size):
+            model.objects.bulk_create(rows, batch_size=self.batch_size)
+            rows.clear()
+
+    def _courses(self, users):
+        """Courses plus their GPA running totals; about 1 in 10 users has none yet."""
+        courses, semester_totals, user_totals = [], [], []
+        created = 0
+        for rng, user in users:
+            semesters = 0 if rng.random() < 0.1 else rng.randint(1, 10)
+            first_year = self.now.year - (semesters + 1) // 2
+            points_total, credits_total, count_total = Decimal(0), Decimal(0), 0
+            for semester in range(semesters):
+                name = f"{first_year + semester // 2} {'First' if semester % 2 == 0 else 'Second'}"
+                if name not in self.semesters:
+                    self.semesters[name] = Semester.objects.resolve(name)
+                points, credits, count = Decimal(0), Decimal(0), 0
+                for number in range(min(max(round(rng.gauss(8, 2)), 4), 12)):
+                    grade, units = _weighted(rng, GRADE_WEIGHTS), _weighted(rng, CREDIT_WEIGHTS)
+                    course_name = f'{rng.choice(DEPARTMENTS)}{100 * (semester // 2 + 1) + number + 1}'
+                    courses.append(Course(user=user, course_name=course_name, credits=units, letter_grade=grade,
+                                          semester_year=name, semester=self.semesters[name]))
+                    course_points, course_credits = course_contribution(courses[-1], self.scale)
+                    points += course_points
+                    credits += course_credits
+                    count += 1
+                    self._flush(Course, courses)
+                points_total, credits_total, count_total = points_total + points, credits_total + credits, count_total + count
+                # Semesters are generated in order, so the running totals are the trajectory
+                semester_totals.append(SemesterGpaTotals(
+                    user=user, semester=self.semesters[name], grade_points=points, credits=credits, course_count=count,
+                    cumulative_points=points_total, cumulative_credits=credits_total, scale_fingerprint=self.scale.fingerprint,
+                ))
+            user_totals.append(UserGpaTotals(user=user, grade_points=points_total, credits=credits_total, course_count=count_total,
+                                             scale_fingerprint=self.scale.fingerprint))
+            created += count_total
+        self._flush(Course, courses, force=True)
+        self._flush(SemesterGpaTotals, semester_totals, force=True)
+        self._flush(UserGpaTotals, user_totals, force=True)
+        return created
+
+    def _messages(self, users):
+        """Chat history; conversation lengths are long-tailed and about 3 in 10 users never chat."""
+        messages = []
+        created = 0
+        for rng, user in users:
+            conversations = 0 if rng.random() < 0.3 else min(int(rng.expovariate(1 / 3)) + 1, 40)
+            for number in range(conversations):
+                length = min(max(int(rng.lognormvariate(1.8, 0.8)), 1), 200)
+                context = rng.choice(CHAT_CONTEXTS)
+                at = self.now - timedelta(days=rng.uniform(0, 365))
+                for index in range(length):
+                    if index % 2 == 0:
+                        content = rng.choice(USER_MESSAGES).format(
+                            target=rng.uniform(3.0, 5.0), units=_weighted(rng, CREDIT_WEIGHTS),
+                            grade=_weighted(rng, GRADE_WEIGHTS), course=f'{rng.choice(DEPARTMENTS)}{rng.randint(101, 499)}',
+                        )
+                    else:
+                        content = rng.choice(AI_MESSAGES)
+                    messages.append(ChatMessage(user=user, conversation_id=f'conv-{number}', role='user' if index % 2 == 0 else 'ai',
+                                                content=content, context=context, created_at=at))
+                    at += timedelta(seconds=rng.randint(5, 600))
+                    self._flush(ChatMessage, messages)
+                created += length
+        self._flush(ChatMessage, messages, force=True)
+        return created
+
+    def _knowledge(self, rng, count):
+        combinations = list(product(QUESTION_TEMPLATES, QUESTION_VERBS, QUESTION_TOPICS))
+        rng.shuffle(combinations)
+        # Questions from an earlier run are skipped, since question_hash is unique
+        existing = set(KnowledgeBase.objects.values_list('question_hash', flat=True))
+        entries = []
+        index = created = 0
+        while created < count:
+            template, verb, topic = combinations[index % len(combinations)]
+            question = template.format(verb, topic)
+            if index >= len(combinations):
+                # Numbered variants keep normalized questions unique past the template space
+                question = f'{question[:-1]} (variant {index // len(combinations)})?'
+            index += 1
+            digest = question_digest(question)
+            if digest in existing:
+                continue
+            created += 1
+            entries.append(KnowledgeBase(
+                question=question, question_hash=digest,
+                answer=f'To {verb} {topic}, contact your course adviser and check the student handbook.',
+                is_verified=rng.random() < 0.8, created_at=self.now - timedelta(days=rng.uniform(0, 730)),
+            ))
+            self._flush(KnowledgeBase, entries)
+        self._flush(KnowledgeBase, entries, force=True)
+        return count
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import profiling
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'filename')
+
+
+class Command(BaseCommand):
+    help = 'List stored request profiles, or show the top functions of one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to show; omit to list profiles.')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative')
+        parser.add_argument('--limit', type=int, default=25, help='Functions (or profiles) to show.')
+        parser.add_argument('--view', help='Only list profiles of this URL name.')
+
+    def handle(self, *args, **options):
+        if options['profile_id']:
+            try:
+                self.stdout.write(profiling.top_functions(options['profile_id'], options['sort'], options['limit']))
+            except FileNotFoundError:
+                raise CommandError(f"No profile {options['profile_id']}")
+            return
+
+        found = [p for p in profiling.profiles() if not options['view'] or p.get('view') == options['view']]
+        if not found:
+            self.stdout.write('No profiles stored')
+            return
+        for profile in found[:options['limit']]:
+            self.stdout.write(
+                f"{profile['id']}  {profile['method']:6} {profile['status']}  {profile['duration_ms']:9.2f}ms  "
+                f"{profile['view'] or '-':24} {profile['path']}  ({profile['trigger']})"
+            )
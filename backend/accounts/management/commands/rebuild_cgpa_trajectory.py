@@ -0,0 +1,28 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts import totals
+from accounts.models import SemesterGpaTotals
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cumulative CGPA trajectory stored on the semester GPA totals, e.g. after a backfill.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to this user id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users recomputed per transaction.')
+
+    def handle(self, *args, **options):
+        users = SemesterGpaTotals.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+        if options['users']:
+            users = users.filter(user_id__in=options['users'])
+
+        checked = corrected = 0
+        user_ids = users.iterator()
+        while batch := list(islice(user_ids, options['batch_size'])):
+            with transaction.atomic():
+                corrected += totals.rebuild_trajectories(batch)
+            checked += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} users, corrected {corrected} semester rows'))
@@ -0,0 +1,63 @@
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import grading, totals
+from accounts.models import Course, User, UserGpaTotals
+
+ZERO = (Decimal(0), Decimal(0), 0)
+
+
+class Command(BaseCommand):
+    help = 'Verify the GPA running totals against the Course rows and rebuild any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift; exit with an error if any is found.')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to this user id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users verified per query.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['users']:
+            users = users.filter(id__in=options['users'])
+
+        fingerprint = grading.get_scale().fingerprint
+        checked = drifted = linked = 0
+        user_ids = users.iterator()
+        while batch := list(islice(user_ids, options['batch_size'])):
+            if not options['check']:
+                # Rows written with bulk_create have no normalized semester yet
+                linked += totals.link_semesters(Course.objects.filter(user_id__in=batch))
+            expected = totals.expected_totals(Course.objects.filter(user_id__in=batch))
+            stored = totals.stored_totals(batch)
+            stored_users, stale = {}, set()
+            rows = UserGpaTotals.objects.filter(user_id__in=batch)
+            for user_id, points, credits, count, scale in rows.values_list('user_id', 'grade_points', 'credits', 'course_count', 'scale_fingerprint'):
+                stored_users[user_id] = (points, credits, count)
+                if scale != fingerprint:
+                    stale.add(user_id)
+            for user_id in batch:
+                checked += 1
+                semesters = expected.get(user_id, {})
+                user_totals = (
+                    sum((t[0] for t in semesters.values()), Decimal(0)),
+                    sum((t[1] for t in semesters.values()), Decimal(0)),
+                    sum(t[2] for t in semesters.values()),
+                )
+                if user_id in stale:
+                    self.stdout.write(f'User {user_id}: totals were kept on another grading scale')
+                elif semesters == stored.get(user_id, {}) and user_totals == stored_users.get(user_id, ZERO):
+                    continue
+                else:
+                    self.stdout.write(f'User {user_id}: totals drifted from Course rows')
+                drifted += 1
+                if not options['check']:
+                    totals.rebuild_user(user_id, semesters)
+
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} of {checked} users have drifted GPA totals')
+        action = 'found' if options['check'] else 'rebuilt'
+        if linked:
+            self.stdout.write(f'Linked {linked} courses to their semester')
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} users, {action} {drifted} with drifted totals'))
@@ -0,0 +1,187 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+``RequestMetricsMiddleware`` records, per resolved URL name and method, a
+latency histogram, a response size histogram, a histogram of SQL queries
+per request and total SQL time. SQL is measured by an execute wrapper that
+``AccountsConfig.ready`` installs on every database connection; it adds to
+the stats of the request in the current context, so queries run from
+``sync_to_async`` threads by async views are counted too.
+
+Each thread writes only to its own shard, so recording takes no locks;
+readers merge the shards. With ``METRICS_MULTIPROC_DIR`` set, every process
+also writes a snapshot of its totals there at most every
+``METRICS_FLUSH_INTERVAL`` seconds and the metrics endpoint merges the
+snapshots of all gunicorn workers. Empty the directory when deploying.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Any other method the client sends is recorded as 'other', keeping the label set bounded
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+HISTOGRAMS = {
+    'latency': ('http_request_duration_seconds', 'Request latency in seconds by URL name.', LATENCY_BUCKETS),
+    'size': ('http_response_size_bytes', 'Response body size in bytes by URL name.', SIZE_BUCKETS),
+    'queries': ('django_sql_queries_per_request', 'SQL queries per request by URL name.', QUERY_BUCKETS),
+}
+
+# [query count, seconds] of the request being handled in this context
+request_sql = ContextVar('metrics_sql', default=None)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    stats = request_sql.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+# --- Recording ---
+
+def _new_series():
+    return {
+        'latency': [0] * (len(LATENCY_BUCKETS) + 1), 'latency_sum': 0.0,
+        'size': [0] * (len(SIZE_BUCKETS) + 1), 'size_sum': 0,
+        'queries': [0] * (len(QUERY_BUCKETS) + 1), 'queries_sum': 0,
+        'sql_seconds': 0.0, 'statuses': {},
+    }
+
+
+_shards = []
+_local = threading.local()
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        _shards.append(shard)
+    return shard
+
+
+def observe(view, method, status, seconds, size, queries, sql_seconds):
+    key = f"{view}|{method if method in METHODS else 'other'}"
+    shard = _shard()
+    series = shard.get(key)
+    if series is None:
+        series = shard[key] = _new_series()
+    series['latency'][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    series['latency_sum'] += seconds
+    if size is not None:
+        series['size'][bisect_left(SIZE_BUCKETS, size)] += 1
+        series['size_sum'] += size
+    series['queries'][bisect_left(QUERY_BUCKETS, queries)] += 1
+    series['queries_sum'] += queries
+    series['sql_seconds'] += sql_seconds
+    series['statuses'][str(status)] = series['statuses'].get(str(status), 0) + 1
+
+
+def _merge(target, snapshot):
+    for key, series in snapshot.items():
+        merged = target.setdefault(key, _new_series())
+        for name in ('latency', 'size', 'queries'):
+            merged[name] = [a + b for a, b in zip(merged[name], series[name])]
+        for name in ('latency_sum', 'size_sum', 'queries_sum', 'sql_seconds'):
+            merged[name] += series[name]
+        for status, count in series['statuses'].items():
+            merged['statuses'][status] = merged['statuses'].get(status, 0) + count
+    return target
+
+
+def snapshot():
+    """Totals of this process, merged across its threads' shards."""
+    merged = {}
+    for shard in list(_shards):
+        # Copies, since the owning threads keep writing while we read
+        _merge(merged, {key: {**series, 'statuses': dict(series['statuses'])} for key, series in list(shard.items())})
+    return merged
+
+
+# --- Multi-process mode ---
+
+_last_flush = 0.0
+
+
+def flush(force=False):
+    """Write this process's snapshot to METRICS_MULTIPROC_DIR if one is configured."""
+    global _last_flush
+    directory = settings.METRICS_MULTIPROC_DIR
+    now = time.monotonic()
+    if not directory or (not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL):
+        return
+    _last_flush = now
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f'.{os.getpid()}-{threading.get_ident()}.tmp'
+    tmp.write_text(json.dumps(snapshot()))
+    os.replace(tmp, path / f'metrics-{os.getpid()}.json')
+
+
+def collect():
+    """Totals of this process, or of every process in multi-process mode."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return snapshot()
+    flush(force=True)
+    merged = {}
+    for path in Path(directory).glob('metrics-*.json'):
+        try:
+            _merge(merged, json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+# --- Exposition ---
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def render(data):
+    lines = []
+    series = sorted(data.items())
+    for name, (metric, help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for key, values in series:
+            view, method = key.split('|', 1)
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values[name]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{_labels(view=view, method=method, le=bound)} {cumulative}')
+            lines.append(f'{metric}_sum{_labels(view=view, method=method)} {values[f"{name}_sum"]}')
+            lines.append(f'{metric}_count{_labels(view=view, method=method)} {cumulative}')
+
+    lines += ['# HELP django_sql_duration_seconds_total Time spent in SQL by URL name.',
+              '# TYPE django_sql_duration_seconds_total counter']
+    for key, values in series:
+        view, method = key.split('|', 1)
+        lines.append(f'django_sql_duration_seconds_total{_labels(view=view, method=method)} {values["sql_seconds"]}')
+
+    lines += ['# HELP http_responses_total Responses by URL name and status code.',
+              '# TYPE http_responses_total counter']
+    for key, values in series:
+        view, method = key.split('|', 1)
+        for status, count in sorted(values['statuses'].items()):
+            lines.append(f'http_responses_total{_labels(view=view, method=method, status=status)} {count}')
+    return '\n'.join(lines) + '\n'
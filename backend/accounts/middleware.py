@@ -0,0 +1,167 @@
+import cProfile
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+
+from . import metrics, profiling
+from .authentication import CachedJWTAuthentication
+
+
+class RequestMetricsMiddleware:
+    """Record latency, response size and SQL usage per resolved URL name (see metrics.py)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        token = metrics.request_sql.set([0, 0.0])
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            self._observe(request, response, start)
+        finally:
+            metrics.request_sql.reset(token)
+        return response
+
+    async def _acall(self, request):
+        token = metrics.request_sql.set([0, 0.0])
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            self._observe(request, response, start)
+        finally:
+            metrics.request_sql.reset(token)
+        return response
+
+    @staticmethod
+    def _observe(request, response, start):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        # Streamed bodies (exports) are produced after this point and aren't sized
+        size = None if response.streaming else len(response.content)
+        queries, sql_seconds = metrics.request_sql.get()
+        metrics.observe(view, request.method, response.status_code, time.perf_counter() - start, size, queries, sql_seconds)
+        metrics.flush()
+
+
+class ProfilingMiddleware:
+    """
+    Run selected requests under cProfile and store the result (see profiling.py).
+
+    A request is profiled when it sends ``X-Profile`` with PROFILE_SECRET, or
+    any ``X-Profile`` value from a staff user (session or JWT), or when it is
+    picked by PROFILE_SAMPLE_RATE. The response carries ``X-Profile-Id``.
+    Unless PROFILING_ENABLED is set the middleware removes itself at startup.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.authenticator = CachedJWTAuthentication()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        trigger = self._trigger(request)
+        if trigger is None and request.META.get('HTTP_X_PROFILE') is not None and self._is_staff(request):
+            trigger = 'staff'
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = self._start()
+        if profiler is None:
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self._save(request, response, profiler, start, trigger)
+
+    async def _acall(self, request):
+        trigger = self._trigger(request)
+        if trigger is None and request.META.get('HTTP_X_PROFILE') is not None and await self._ais_staff(request):
+            trigger = 'staff'
+        if trigger is None:
+            return await self.get_response(request)
+
+        # Other coroutines interleaved on the event loop show up in the profile too
+        profiler = self._start()
+        if profiler is None:
+            return await self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self._save(request, response, profiler, start, trigger)
+
+    @staticmethod
+    def _trigger(request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header is None:
+            rate = settings.PROFILE_SAMPLE_RATE
+            return 'sample' if rate and random.random() < rate else None
+        if settings.PROFILE_SECRET and constant_time_compare(header, settings.PROFILE_SECRET):
+            return 'secret'
+        return None
+
+    def _is_staff(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        try:
+            result = self.authenticator.authenticate(request)
+        except exceptions.APIException:
+            return False
+        return bool(result and result[0].is_staff)
+
+    async def _ais_staff(self, request):
+        if hasattr(request, 'auser') and (await request.auser()).is_staff:
+            return True
+        try:
+            result = await self.authenticator.aauthenticate(request)
+        except exceptions.APIException:
+            return False
+        return bool(result and result[0].is_staff)
+
+    @staticmethod
+    def _start():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active per process; skip rather than wait
+            return None
+        return profiler
+
+    @staticmethod
+    def _save(request, response, profiler, start, trigger):
+        match = request.resolver_match
+        response['X-Profile-Id'] = profiling.save(profiler, {
+            'method': request.method,
+            'path': request.path,
+            'view': (match.url_name or match.view_name) if match else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'trigger': trigger,
+        })
+        return response
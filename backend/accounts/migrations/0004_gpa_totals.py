@@ -0,0 +1,81 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:23
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of the 5.0 scale at the time of this migration
+GRADE_POINTS = {'A': 5, 'B': 4, 'C': 3, 'D': 2, 'E': 1, 'F': 0}
+
+
+def backfill_totals(apps, schema_editor):
+    Course = apps.get_model('accounts', 'Course')
+    UserGpaTotals = apps.get_model('accounts', 'UserGpaTotals')
+    SemesterGpaTotals = apps.get_model('accounts', 'SemesterGpaTotals')
+
+    semesters = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    courses = Course.objects.order_by().values_list('user_id', 'semester_year', 'letter_grade', 'credits')
+    for user_id, semester_year, letter_grade, credits in courses.iterator(chunk_size=2000):
+        totals = semesters[(user_id, semester_year or '')]
+        grade = (letter_grade or '').upper().strip()
+        if grade in GRADE_POINTS:
+            totals[0] += GRADE_POINTS[grade] * credits
+            totals[1] += credits
+        totals[2] += 1
+
+    users = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for (user_id, _), (points, credits, count) in semesters.items():
+        users[user_id][0] += points
+        users[user_id][1] += credits
+        users[user_id][2] += count
+
+    SemesterGpaTotals.objects.bulk_create([
+        SemesterGpaTotals(user_id=user_id, semester_year=semester_year, grade_points=points, credits=credits, course_count=count)
+        for (user_id, semester_year), (points, credits, count) in semesters.items()
+    ], batch_size=1000)
+    UserGpaTotals.objects.bulk_create([
+        UserGpaTotals(user_id=user_id, grade_points=points, credits=credits, course_count=count)
+        for user_id, (points, credits, count) in users.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_knowledgebase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserGpaTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade_points', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('credits', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('course_count', models.IntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gpa_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SemesterGpaTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade_points', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('credits', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('course_count', models.IntegerField(default=0)),
+                ('semester_year', models.CharField(blank=True, default='', max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='semester_gpa_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'semester_year'), name='unique_user_semester_totals')],
+            },
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
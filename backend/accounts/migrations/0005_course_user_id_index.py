@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_gpa_totals'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='course',
+            options={'ordering': ['-id']},
+        ),
+        # Build the composite index before dropping the single-column one
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', 'id'], name='course_user_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='courses', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
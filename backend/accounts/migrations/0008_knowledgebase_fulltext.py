@@ -0,0 +1,70 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:41
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_knowledgebase_fts USING fts5(
+        question, answer, content='accounts_knowledgebase', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_insert AFTER INSERT ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_delete AFTER DELETE ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_knowledgebase_fts_update AFTER UPDATE OF question, answer ON accounts_knowledgebase BEGIN
+        INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO accounts_knowledgebase_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    """,
+    "INSERT INTO accounts_knowledgebase_fts(accounts_knowledgebase_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_insert',
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_delete',
+    'DROP TRIGGER IF EXISTS accounts_knowledgebase_fts_update',
+    'DROP TABLE IF EXISTS accounts_knowledgebase_fts',
+]
+
+# Must match the expression used by accounts.search so the planner can use the index
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX accounts_knowledgebase_search_idx ON accounts_knowledgebase
+    USING GIN (to_tsvector('english', question || ' ' || answer))
+    """,
+]
+
+POSTGRES_REVERSE = ['DROP INDEX IF EXISTS accounts_knowledgebase_search_idx']
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor in statements:
+            for statement in statements[vendor]:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_archivedconversation'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
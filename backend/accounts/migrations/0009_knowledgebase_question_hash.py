@@ -0,0 +1,77 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:52
+
+import hashlib
+import importlib
+import unicodedata
+
+from django.db import migrations, models
+
+fulltext = importlib.import_module('accounts.migrations.0008_knowledgebase_fulltext')
+
+
+# Frozen copy of accounts.models.normalize_question at the time of this migration
+def normalize_question(text):
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return ' '.join(text.split())
+
+
+def backfill_question_hash(apps, schema_editor):
+    KnowledgeBase = apps.get_model('accounts', 'KnowledgeBase')
+    seen = {}
+    collisions = []
+    for entry in KnowledgeBase.objects.order_by('id').only('id', 'question').iterator():
+        digest = hashlib.sha256(normalize_question(entry.question).encode()).hexdigest()
+        if digest in seen:
+            collisions.append(f'  #{entry.id} {entry.question!r} duplicates #{seen[digest]}')
+            continue
+        seen[digest] = entry.id
+        KnowledgeBase.objects.filter(id=entry.id).update(question_hash=digest)
+    # Equivalent questions can't share the new unique hash; refuse rather than drop answers
+    if collisions:
+        raise RuntimeError(
+            'Knowledge base entries differ only in case, punctuation or spacing; '
+            'merge or reword them and rerun migrate:\n' + '\n'.join(collisions)
+        )
+
+
+def restore_fulltext_triggers(apps, schema_editor):
+    # SQLite rebuilds the table for the field alterations, which drops its triggers
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in fulltext.SQLITE_FORWARD[1:]:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in fulltext.SQLITE_REVERSE[:3]:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_knowledgebase_fulltext'),
+    ]
+
+    # The triggers are dropped before and recreated after the table rebuilds, in both directions
+    operations = [
+        migrations.RunPython(drop_fulltext_triggers, restore_fulltext_triggers),
+        migrations.AddField(
+            model_name='knowledgebase',
+            name='question_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_question_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='knowledgebase',
+            name='question_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='knowledgebase',
+            name='question',
+            field=models.TextField(),
+        ),
+        migrations.RunPython(restore_fulltext_triggers, drop_fulltext_triggers),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# (name, is_default, [(grade, points, min_percent)]); the default matches the previous hardcoded scale
+SCALES = [
+    ('5.0', True, [('A', 5, None), ('B', 4, None), ('C', 3, None), ('D', 2, None), ('E', 1, None), ('F', 0, None)]),
+    ('5.0 percentage', False, [('A', 5, 70), ('B', 4, 60), ('C', 3, 50), ('D', 2, 45), ('E', 1, 40), ('F', 0, 0)]),
+    ('4.0', False, [('A', 4, None), ('B', 3, None), ('C', 2, None), ('D', 1, None), ('F', 0, None)]),
+    ('4.0 plus/minus', False, [
+        ('A+', '4.0', None), ('A', '4.0', None), ('A-', '3.7', None), ('B+', '3.3', None), ('B', '3.0', None),
+        ('B-', '2.7', None), ('C+', '2.3', None), ('C', '2.0', None), ('C-', '1.7', None), ('D+', '1.3', None),
+        ('D', '1.0', None), ('D-', '0.7', None), ('F', '0.0', None),
+    ]),
+]
+
+
+def seed_scales(apps, schema_editor):
+    GradingScale = apps.get_model('accounts', 'GradingScale')
+    GradeBand = apps.get_model('accounts', 'GradeBand')
+    for name, is_default, bands in SCALES:
+        scale = GradingScale.objects.create(name=name, is_default=is_default)
+        GradeBand.objects.bulk_create(
+            GradeBand(scale=scale, grade=grade, points=points, min_percent=min_percent) for grade, points, min_percent in bands
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_knowledgebase_question_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('is_default', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='single_default_grading_scale')],
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(max_length=2)),
+                ('points', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('min_percent', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('scale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='accounts.gradingscale')),
+            ],
+            options={
+                'ordering': ['-points', 'grade'],
+                'constraints': [models.UniqueConstraint(fields=('scale', 'grade'), name='unique_scale_grade')],
+            },
+        ),
+        migrations.RunPython(seed_scales, migrations.RunPython.noop),
+    ]
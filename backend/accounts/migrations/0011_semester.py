@@ -0,0 +1,42 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_grading_scales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Semester',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('institution', models.CharField(blank=True, default='', max_length=100)),
+                ('year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('term', models.PositiveSmallIntegerField(default=0)),
+                ('label', models.CharField(max_length=50)),
+            ],
+            options={
+                'ordering': [models.OrderBy(models.F('year'), nulls_first=True), 'term', 'label'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('year__isnull', False)), fields=('institution', 'year', 'term'), name='unique_semester_term'), models.UniqueConstraint(condition=models.Q(('year__isnull', True)), fields=('institution', 'label'), name='unique_semester_label')],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='semester',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='accounts.semester'),
+        ),
+        migrations.AddField(
+            model_name='semestergpatotals',
+            name='semester',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.semester'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', 'semester'], name='course_user_semester_idx'),
+        ),
+    ]
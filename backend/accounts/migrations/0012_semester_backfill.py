@@ -0,0 +1,84 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:20
+
+import re
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+# Frozen copy of accounts.models.parse_semester at the time of this migration
+TERM_WORDS = {
+    'first': 1, '1st': 1, 'harmattan': 1, 'spring': 1,
+    'second': 2, '2nd': 2, 'rain': 2, 'summer': 2,
+    'third': 3, '3rd': 3, 'fall': 3, 'autumn': 3,
+}
+_YEAR = re.compile(r'(?<!\d)((?:19|20)\d\d)(?!\d)')
+_WORD = re.compile(r'[a-z0-9]+')
+_TERM_NUMBER = re.compile(r'\b(?:s|sem|semester|t|term)\.?\s*([1-9])\b|(?<!\d)(?:19|20)\d\d\s*[-./]\s*([1-9])\b')
+
+
+def parse_semester(text):
+    label = ' '.join((text or '').split())[:50]
+    if not label:
+        return None
+    lowered = label.casefold()
+    year = _YEAR.search(lowered)
+    term = next((TERM_WORDS[word] for word in _WORD.findall(lowered) if word in TERM_WORDS), 0)
+    if not term and (number := _TERM_NUMBER.search(lowered)):
+        term = int(number.group(1) or number.group(2))
+    return (int(year.group(1)) if year else None), term, label
+
+
+def resolve(Semester, text):
+    year, term, label = parse_semester(text)
+    if year is None:
+        return Semester.objects.get_or_create(institution='', year=None, label=label, defaults={'term': term})[0]
+    return Semester.objects.get_or_create(institution='', year=year, term=term, defaults={'label': label})[0]
+
+
+def link_semesters(apps, schema_editor):
+    Semester = apps.get_model('accounts', 'Semester')
+    Course = apps.get_model('accounts', 'Course')
+    SemesterGpaTotals = apps.get_model('accounts', 'SemesterGpaTotals')
+
+    uses = dict(SemesterGpaTotals.objects.exclude(semester_year='').values_list('semester_year', 'course_count'))
+    for row in Course.objects.order_by().exclude(semester_year='').values('semester_year').annotate(uses=Count('id')):
+        if row['semester_year'] is not None:
+            uses[row['semester_year']] = row['uses']
+
+    # Most-used spelling first, so it becomes the label of a semester written several ways
+    spellings = defaultdict(list)
+    for name in sorted(uses, key=uses.get, reverse=True):
+        if parse_semester(name) is not None:
+            spellings[resolve(Semester, name).id].append(name)
+
+    for semester_id, names in spellings.items():
+        Course.objects.filter(semester_year__in=names).update(semester_id=semester_id)
+        if len(names) == 1:
+            SemesterGpaTotals.objects.filter(semester_year=names[0]).update(semester_id=semester_id)
+            continue
+        # A user's totals rows for each spelling collapse into one
+        kept = {}
+        for row in SemesterGpaTotals.objects.filter(semester_year__in=names).order_by('id'):
+            first = kept.get(row.user_id)
+            if first is None:
+                kept[row.user_id] = row
+                continue
+            first.grade_points += row.grade_points
+            first.credits += row.credits
+            first.course_count += row.course_count
+            row.delete()
+        for row in kept.values():
+            row.semester_id = semester_id
+            row.save(update_fields=['semester', 'grade_points', 'credits', 'course_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_semester'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_semesters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_semester_backfill'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='semestergpatotals',
+            name='unique_user_semester_totals',
+        ),
+        migrations.AddConstraint(
+            model_name='semestergpatotals',
+            constraint=models.UniqueConstraint(fields=('user', 'semester'), name='unique_user_semester_totals'),
+        ),
+        migrations.AddConstraint(
+            model_name='semestergpatotals',
+            constraint=models.UniqueConstraint(condition=models.Q(('semester__isnull', True)), fields=('user',), name='unique_user_no_semester_totals'),
+        ),
+        migrations.RemoveField(
+            model_name='semestergpatotals',
+            name='semester_year',
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:23
+
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+# Frozen copy of the chronological order in accounts.models.semester_order
+def order(row):
+    if row.semester_id is None:
+        return False, ()
+    year, term, label = row.semester.year, row.semester.term, row.semester.label
+    return True, (year is not None, year or 0, term, '' if year is not None else label)
+
+
+def backfill_trajectory(apps, schema_editor):
+    SemesterGpaTotals = apps.get_model('accounts', 'SemesterGpaTotals')
+    rows = SemesterGpaTotals.objects.select_related('semester').order_by('user_id').iterator(chunk_size=2000)
+    changed = []
+    for _, user_rows in groupby(rows, key=lambda row: row.user_id):
+        points = credits = Decimal(0)
+        for row in sorted(user_rows, key=order):
+            points += row.grade_points
+            credits += row.credits
+            row.cumulative_points, row.cumulative_credits = points, credits
+            changed.append(row)
+        if len(changed) >= 1000:
+            SemesterGpaTotals.objects.bulk_update(changed, ['cumulative_points', 'cumulative_credits'])
+            changed.clear()
+    SemesterGpaTotals.objects.bulk_update(changed, ['cumulative_points', 'cumulative_credits'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_semester_totals_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semestergpatotals',
+            name='cumulative_credits',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='semestergpatotals',
+            name='cumulative_points',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=14),
+        ),
+        migrations.RunPython(backfill_trajectory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:34
+
+import json
+import lzma
+import zlib
+
+from django.db import migrations, models
+
+DECOMPRESS = {'zlib': zlib.decompress, 'lzma': lzma.decompress}
+
+
+def backfill_message_range(apps, schema_editor):
+    ArchivedConversation = apps.get_model('accounts', 'ArchivedConversation')
+    archives = ArchivedConversation.objects.filter(min_message_id__isnull=True).only('id', 'codec', 'payload')
+    for archive in archives.iterator(chunk_size=100):
+        ids = [message['id'] for message in json.loads(DECOMPRESS[archive.codec](bytes(archive.payload)))]
+        ArchivedConversation.objects.filter(id=archive.id).update(min_message_id=min(ids), max_message_id=max(ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_cgpa_trajectory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedconversation',
+            name='max_message_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedconversation',
+            name='min_message_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_message_range, migrations.RunPython.noop),
+    ]
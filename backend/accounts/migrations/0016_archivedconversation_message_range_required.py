@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_archivedconversation_message_range'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedconversation',
+            name='max_message_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='archivedconversation',
+            name='min_message_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
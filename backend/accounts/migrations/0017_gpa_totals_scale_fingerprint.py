@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_archivedconversation_message_range_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semestergpatotals',
+            name='scale_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='usergpatotals',
+            name='scale_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import hashlib
+import re
+import unicodedata
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 
 # --- Custom User Model ---
@@ -7,23 +12,157 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    def save(self, *args, **kwargs):
+        from .authentication import CACHED_FIELDS, invalidate_user
+
+        super().save(*args, **kwargs)
+        # Logins only touch last_login, which the auth cache doesn't hold
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & {*CACHED_FIELDS, 'password'}:
+            invalidate_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .authentication import invalidate_user
+
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_user(user_id)
+        return result
+
+# --- Semesters ---
+TERM_WORDS = {
+    'first': 1, '1st': 1, 'harmattan': 1, 'spring': 1,
+    'second': 2, '2nd': 2, 'rain': 2, 'summer': 2,
+    'third': 3, '3rd': 3, 'fall': 3, 'autumn': 3,
+}
+_YEAR = re.compile(r'(?<!\d)((?:19|20)\d\d)(?!\d)')
+_WORD = re.compile(r'[a-z0-9]+')
+_TERM_NUMBER = re.compile(r'\b(?:s|sem|semester|t|term)\.?\s*([1-9])\b|(?<!\d)(?:19|20)\d\d\s*[-./]\s*([1-9])\b')
+
+def parse_semester(text):
+    """
+    Split a free-text semester name into ``(year, term, label)``, or None when
+    blank or not a string.
+
+    ``year`` is the first four-digit year (the start of a '2023/2024' session)
+    and ``term`` the ordinal within it, from words like 'First' or 'Fall' or
+    forms like 'S2' and '2023.2'; missing parts are None and 0. Names with a
+    year are identified by ``(year, term)``, the rest only by their label.
+    """
+    if not isinstance(text, str):
+        return None
+    label = ' '.join(text.split())[:50]
+    if not label:
+        return None
+    lowered = label.casefold()
+    year = _YEAR.search(lowered)
+    term = next((TERM_WORDS[word] for word in _WORD.findall(lowered) if word in TERM_WORDS), 0)
+    if not term and (number := _TERM_NUMBER.search(lowered)):
+        term = int(number.group(1) or number.group(2))
+    return (int(year.group(1)) if year else None), term, label
+
+def semester_order(year, term, label):
+    """
+    Sort key matching Semester's ordering (label-only semesters first, then
+    by year and term); equal for every spelling of one semester.
+    """
+    return year is not None, year or 0, term, '' if year is not None else label
+
+class SemesterManager(models.Manager):
+    @staticmethod
+    def _lookup(text, institution):
+        parsed = parse_semester(text)
+        if parsed is None:
+            return None
+        year, term, label = parsed
+        if year is None:
+            return {'institution': institution, 'year': None, 'label': label}, {'term': term}
+        return {'institution': institution, 'year': year, 'term': term}, {'label': label}
+
+    def matching(self, text, institution=''):
+        """The Semester (at most one) that a free-text name normalizes to."""
+        lookup = self._lookup(text, institution)
+        return self.none() if lookup is None else self.filter(**lookup[0])
+
+    def resolve(self, text, institution=''):
+        """The Semester for a free-text name, created on first use; None when blank."""
+        lookup = self._lookup(text, institution)
+        if lookup is None:
+            return None
+        return self.get_or_create(**lookup[0], defaults=lookup[1])[0]
+
+class Semester(models.Model):
+    institution = models.CharField(max_length=100, blank=True, default='')
+    year = models.PositiveSmallIntegerField(null=True, blank=True)
+    # Ordinal within the year; 0 when the name carries no term
+    term = models.PositiveSmallIntegerField(default=0)
+    # Display name, as first entered
+    label = models.CharField(max_length=50)
+
+    objects = SemesterManager()
+
+    class Meta:
+        ordering = [models.F('year').asc(nulls_first=True), 'term', 'label']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['institution', 'year', 'term'], condition=models.Q(year__isnull=False), name='unique_semester_term',
+            ),
+            models.UniqueConstraint(
+                fields=['institution', 'label'], condition=models.Q(year__isnull=True), name='unique_semester_label',
+            ),
+        ]
+
+    def __str__(self):
+        return self.label
+
 # --- Course Model ---
 class Course(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses')
+    # Indexed through the (user, id) composite index below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses', db_index=False)
     course_name = models.CharField(max_length=100)
     credits = models.DecimalField(max_digits=3, decimal_places=1)
     letter_grade = models.CharField(max_length=2)
+    # Free-text name as entered; ``semester`` is its normalized form, set on save
     semester_year = models.CharField(max_length=50, blank=True, null=True)
+    # Indexed through the (user, semester) composite index below
+    semester = models.ForeignKey(Semester, on_delete=models.PROTECT, null=True, blank=True, editable=False,
+                                 related_name='courses', db_index=False)
 
     def __str__(self):
         return f"{self.user.username}'s Course: {self.course_name}"
 
     class Meta:
-        ordering = ['course_name']
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='course_user_id_idx'),
+            models.Index(fields=['user', 'semester'], name='course_user_semester_idx'),
+        ]
+
+    # semester_year as last loaded or saved; the sentinel makes new instances resolve it
+    _saved_semester_year = object()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        course = super().from_db(db, field_names, values)
+        if 'semester_year' in course.__dict__:
+            course._saved_semester_year = course.semester_year
+        return course
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'semester_year' in update_fields:
+            # Only a changed name, or a row written by bulk_create without its semester, needs a lookup
+            if self.semester_year != self._saved_semester_year or (self.semester_id is None and self.semester_year):
+                self.semester = Semester.objects.resolve(self.semester_year)
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'semester'}
+        super().save(*args, **kwargs)
+        self._saved_semester_year = self.semester_year
 
 # --- Chat History Model ---
 class ChatMessage(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages')
+    # Indexed through the (user, conversation_id, created_at, id) composite index below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_messages', db_index=False)
     conversation_id = models.CharField(max_length=50, default='default')
     role = models.CharField(max_length=10, choices=[('user', 'User'), ('ai', 'AI')])
     content = models.TextField()
@@ -32,16 +171,174 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['user', 'conversation_id', 'created_at', 'id'], name='chat_user_conv_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.role}: {self.content[:50]}"
 
+# --- Archived Chat Conversations (cold storage) ---
+class ArchivedConversation(models.Model):
+    CODEC_CHOICES = [('zlib', 'zlib'), ('lzma', 'lzma')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_conversations', db_index=False)
+    conversation_id = models.CharField(max_length=50)
+    message_count = models.IntegerField()
+    first_message_at = models.DateTimeField()
+    last_message_at = models.DateTimeField()
+    # Id range of the archived messages, to find the archive holding a message without decompressing
+    min_message_id = models.BigIntegerField()
+    max_message_id = models.BigIntegerField()
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, default='zlib')
+    # Compressed JSON list of the archived messages, oldest first
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'conversation_id', 'last_message_at'], name='archived_conv_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id} ({self.message_count} messages, archived)"
+
 # --- NEW: Knowledge Base Model ---
+def normalize_question(text):
+    """Casefold, drop punctuation and collapse whitespace so trivial variants match."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return ' '.join(text.split())
+
+def question_digest(text):
+    return hashlib.sha256(normalize_question(text).encode()).hexdigest()
+
 class KnowledgeBase(models.Model):
-    question = models.TextField(unique=True)
+    question = models.TextField()
+    # SHA-256 of the normalized question; the fixed-width key used for uniqueness and lookups
+    question_hash = models.CharField(max_length=64, unique=True, editable=False)
     answer = models.TextField()
     is_verified = models.BooleanField(default=False) 
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.question[:50]
+
+    def clean(self):
+        duplicates = KnowledgeBase.objects.filter(question_hash=question_digest(self.question)).exclude(pk=self.pk)
+        if duplicates.exists():
+            raise ValidationError({'question': 'An equivalent question already exists.'})
+
+    def save(self, *args, **kwargs):
+        from .knowledge import invalidate_answer
+
+        previous_hash = self.question_hash
+        digest = self.question_hash = question_digest(self.question)
+        super().save(*args, **kwargs)
+        # After commit, so a concurrent lookup can't re-cache the old answer
+        transaction.on_commit(lambda: invalidate_answer(digest, previous_hash))
+
+    def delete(self, *args, **kwargs):
+        from .knowledge import invalidate_answer
+
+        digest = self.question_hash
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: invalidate_answer(digest))
+        return result
+
+# --- GPA Running Totals ---
+class GpaTotals(models.Model):
+    grade_points = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    credits = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    course_count = models.IntegerField(default=0)
+    # GradeScale.fingerprint of the scale these totals were kept on; blank when stale
+    scale_fingerprint = models.CharField(max_length=40, blank=True, default='')
+
+    class Meta:
+        abstract = True
+
+class UserGpaTotals(GpaTotals):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='gpa_totals')
+
+    def __str__(self):
+        return f"GPA totals for user {self.user_id}"
+
+class SemesterGpaTotals(GpaTotals):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='semester_gpa_totals')
+    # Null holds the courses without a semester
+    semester = models.ForeignKey(Semester, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    # Totals through this semester in chronological order, i.e. the user's CGPA trajectory
+    cumulative_points = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    cumulative_credits = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'semester'], name='unique_user_semester_totals'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(semester__isnull=True), name='unique_user_no_semester_totals'),
+        ]
+
+    def __str__(self):
+        return f"GPA totals for user {self.user_id}, semester {self.semester_id or 'none'}"
+
+# --- Grading Scales ---
+class GradingScale(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    # Used when a request names no scale; the GPA running totals are kept on it
+    is_default = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['is_default'], condition=models.Q(is_default=True), name='single_default_grading_scale'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .grading import invalidate_scales
+
+        with transaction.atomic():
+            if self.is_default:
+                GradingScale.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
+            super().save(*args, **kwargs)
+        invalidate_scales()
+
+    def delete(self, *args, **kwargs):
+        from .grading import invalidate_scales
+
+        result = super().delete(*args, **kwargs)
+        invalidate_scales()
+        return result
+
+class GradeBand(models.Model):
+    scale = models.ForeignKey(GradingScale, on_delete=models.CASCADE, related_name='bands')
+    # Same width as Course.letter_grade; stored upper-case
+    grade = models.CharField(max_length=2)
+    points = models.DecimalField(max_digits=4, decimal_places=2)
+    # Lowest percentage mark earning this grade, for scales that also accept marks
+    min_percent = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        ordering = ['-points', 'grade']
+        constraints = [
+            models.UniqueConstraint(fields=['scale', 'grade'], name='unique_scale_grade'),
+        ]
+
+    def __str__(self):
+        return f"{self.grade} = {self.points}"
+
+    def save(self, *args, **kwargs):
+        from .grading import invalidate_scales
+
+        self.grade = self.grade.upper().strip()
+        super().save(*args, **kwargs)
+        invalidate_scales()
+
+    def delete(self, *args, **kwargs):
+        from .grading import invalidate_scales
+
+        result = super().delete(*args, **kwargs)
+        invalidate_scales()
+        return result
@@ -0,0 +1,156 @@
+"""
+Target-CGPA planner.
+
+Given the grade points and credits earned so far, the credits of the
+remaining courses and a target CGPA, find the grades that reach the target
+with the least effort. Effort grows with the square of the grade points,
+weighted by credits, so the plan spreads work across courses instead of
+demanding top grades in a few. Reaching a weighted-points total is a
+multiple-choice knapsack: the DP runs over totals in exact integer units
+(the gcd of all grade-point x credit products), capped at the required
+total, with one numpy pass per remaining course and grade. Totals beyond
+``PLANNER_MAX_STATES`` units are coarsened conservatively, so a returned
+plan always meets the target.
+"""
+import math
+from decimal import ROUND_CEILING, Decimal
+
+import numpy as np
+from django.conf import settings
+
+from .gpa import normalize_grade
+
+# Weighted points are kept in thousandths: grade points have 2 decimals, credits 1
+_MILLI = 1000
+
+
+class InvalidPlan(ValueError):
+    pass
+
+
+def _decimal(value, what):
+    try:
+        number = Decimal(str(value))
+    except ArithmeticError:
+        raise InvalidPlan(f'Invalid {what}')
+    if not number.is_finite() or number < 0:
+        raise InvalidPlan(f'Invalid {what}')
+    return number
+
+
+def history_totals(grades, credits, scale):
+    """(grade_points, graded_credits) of an ad-hoc transcript; unknown grades are skipped."""
+    if not isinstance(grades, list) or not isinstance(credits, list) or len(grades) != len(credits):
+        raise InvalidPlan('Invalid history')
+    points = graded = Decimal(0)
+    for grade, credit in zip(grades, credits):
+        value = scale.points.get(normalize_grade(grade))
+        if value is not None:
+            credit = _decimal(credit, 'credits')
+            points += value * credit
+            graded += credit
+    return points, graded
+
+
+def _choices(scale):
+    """Letter grades of ``scale`` with distinct points, lowest first."""
+    by_points = {}
+    for grade, points, _ in scale.bands:
+        by_points.setdefault(points, grade)
+    return sorted((points, grade) for points, grade in by_points.items())
+
+
+def _gpa(points, credits):
+    return round(float(points / credits), 2) if credits else None
+
+
+def plan(history_points, history_credits, remaining, target, scale):
+    """
+    Grades for the ``remaining`` course credits that lift the CGPA to ``target``.
+
+    Returns the response payload; ``feasible`` is False when even the top
+    grade everywhere falls short, in which case ``max_cgpa`` says how close
+    the student can get.
+    """
+    if not isinstance(remaining, list) or not remaining:
+        raise InvalidPlan('Invalid remaining_credits')
+    credits = [_decimal(credit, 'remaining_credits') for credit in remaining]
+    if not all(credits) or len(credits) > settings.PLANNER_MAX_COURSES:
+        raise InvalidPlan(f'remaining_credits must hold 1 to {settings.PLANNER_MAX_COURSES} positive values')
+    target = _decimal(target, 'target')
+    choices = _choices(scale)
+    if not choices or target > choices[-1][0]:
+        raise InvalidPlan('Target is above the top of the grading scale')
+
+    total_credits = history_credits + sum(credits)
+    needed = target * total_credits - history_points
+    payload = {
+        'success': True,
+        'target': float(target),
+        'current_cgpa': _gpa(history_points, history_credits),
+        'max_cgpa': _gpa(history_points + choices[-1][0] * sum(credits), total_credits),
+    }
+
+    if needed <= 0:
+        picks = [0] * len(credits)
+    elif choices[-1][0] * sum(credits) < needed:
+        return {**payload, 'feasible': False, 'plan': []}
+    else:
+        picks = _knapsack(credits, choices, needed)
+
+    earned = history_points + sum(choices[pick][0] * credit for pick, credit in zip(picks, credits))
+    return {
+        **payload,
+        'feasible': True,
+        'projected_cgpa': _gpa(earned, total_credits),
+        'plan': [
+            {'credits': float(credit), 'grade': choices[pick][1], 'points': float(choices[pick][0])}
+            for pick, credit in zip(picks, credits)
+        ],
+    }
+
+
+def _knapsack(credits, choices, needed):
+    """Index into ``choices`` per course, reaching ``needed`` weighted points at minimal effort."""
+    weights = np.array([[int(points * credit * _MILLI) for points, _ in choices] for credit in credits], dtype=np.int64)
+    effort = np.array([[float(credit * points * points) for points, _ in choices] for credit in credits])
+    needed = int((needed * _MILLI).to_integral_value(ROUND_CEILING))
+
+    unit = math.gcd(*weights.ravel().tolist()) or 1
+    if needed // unit > settings.PLANNER_MAX_STATES:
+        # Rounding weights down and the goal up keeps any plan found a valid one
+        unit = -(-needed // settings.PLANNER_MAX_STATES)
+    weights //= unit
+    cap = -(-needed // unit)
+
+    best = np.full(cap + 1, np.inf)
+    best[0] = 0.0
+    picks = np.zeros((len(credits), cap + 1), dtype=np.int8)
+    # Previous state of the capped ("at least cap") state, which many totals collapse into
+    capped_from = np.zeros(len(credits), dtype=np.int64)
+    for course in range(len(credits)):
+        layer = np.full(cap + 1, np.inf)
+        for choice, (weight, cost) in enumerate(zip(weights[course].tolist(), effort[course].tolist())):
+            if weight < cap:
+                candidate = best[:cap - weight] + cost
+                better = candidate < layer[weight:cap]
+                np.copyto(layer[weight:cap], candidate, where=better)
+                np.copyto(picks[course, weight:cap], choice, where=better)
+            origin = max(cap - weight, 0)
+            origin += int(best[origin:].argmin())
+            if best[origin] + cost < layer[cap]:
+                layer[cap] = best[origin] + cost
+                picks[course, cap] = choice
+                capped_from[course] = origin
+        best = layer
+
+    if not np.isfinite(best[cap]):
+        # Only reachable after coarsening; the top grade everywhere always works
+        return [len(choices) - 1] * len(credits)
+    chosen = [0] * len(credits)
+    state = cap
+    for course in reversed(range(len(credits))):
+        choice = int(picks[course, state])
+        chosen[course] = choice
+        state = int(capped_from[course]) if state == cap else state - int(weights[course, choice])
+    return chosen
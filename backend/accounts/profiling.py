@@ -0,0 +1,59 @@
+"""
+On-disk store for per-request cProfile dumps.
+
+``ProfilingMiddleware`` (see middleware.py) writes one ``<id>.prof`` pstats
+dump plus an ``<id>.json`` description per profiled request under
+``PROFILE_DIR``, keeping the newest ``PROFILE_MAX_FILES``. Browse them with
+``manage.py profiles``.
+"""
+import io
+import json
+import os
+import pstats
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def _profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def save(profiler, meta):
+    """Store a finished profiler with its request ``meta`` and return the profile id."""
+    path = _profile_dir()
+    path.mkdir(parents=True, exist_ok=True)
+    profile_id = f'{timezone.now():%Y%m%d%H%M%S%f}-{os.getpid()}'
+    profiler.dump_stats(path / f'{profile_id}.prof')
+    (path / f'{profile_id}.json').write_text(json.dumps({'id': profile_id, **meta}))
+    _rotate(path)
+    return profile_id
+
+
+def _rotate(path):
+    dumps = sorted(path.glob('*.prof'))
+    for old in dumps[:max(len(dumps) - settings.PROFILE_MAX_FILES, 0)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.json').unlink(missing_ok=True)
+
+
+def profiles():
+    """Descriptions of the stored profiles, newest first."""
+    found = []
+    for meta in sorted(_profile_dir().glob('*.json'), reverse=True):
+        try:
+            found.append(json.loads(meta.read_text()))
+        except (OSError, ValueError):
+            continue
+    return found
+
+
+def top_functions(profile_id, sort='cumulative', limit=25):
+    """The pstats report of one profile, limited to its ``limit`` top functions."""
+    path = _profile_dir() / f'{Path(profile_id).name}.prof'
+    if not path.exists():
+        raise FileNotFoundError(profile_id)
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,78 @@
+"""
+Ranked full-text search over KnowledgeBase.
+
+SQLite uses the FTS5 table ``accounts_knowledgebase_fts`` and PostgreSQL a
+GIN index on a ``to_tsvector`` expression, both created in migration 0008
+and kept in sync by the database itself. Other backends fall back to
+``icontains`` matching without ranking.
+"""
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import KnowledgeBase
+
+WORD_RE = re.compile(r'\w+')
+
+SQLITE_SEARCH = """
+    SELECT kb.id, -bm25(accounts_knowledgebase_fts) AS rank
+    FROM accounts_knowledgebase_fts
+    JOIN accounts_knowledgebase kb ON kb.id = accounts_knowledgebase_fts.rowid
+    WHERE accounts_knowledgebase_fts MATCH %s {verified}
+    ORDER BY bm25(accounts_knowledgebase_fts)
+    {limit}
+"""
+
+POSTGRES_SEARCH = """
+    SELECT id, ts_rank(to_tsvector('english', question || ' ' || answer), query) AS rank
+    FROM accounts_knowledgebase, plainto_tsquery('english', %s) query
+    WHERE to_tsvector('english', question || ' ' || answer) @@ query {verified}
+    ORDER BY rank DESC
+    {limit}
+"""
+
+
+def _ranked_ids(sql, term, verified, limit):
+    params = [term]
+    clauses = {'verified': '', 'limit': ''}
+    if verified is not None:
+        clauses['verified'] = 'AND is_verified = %s'
+        params.append(verified)
+    if limit is not None:
+        clauses['limit'] = 'LIMIT %s'
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(**clauses), params)
+        return cursor.fetchall()
+
+
+def _fallback(words, verified):
+    queryset = KnowledgeBase.objects.filter(reduce(and_, (
+        Q(question__icontains=word) | Q(answer__icontains=word) for word in words
+    )))
+    if verified is not None:
+        queryset = queryset.filter(is_verified=verified)
+    return queryset.order_by('-id')
+
+
+def ranked_ids(query, verified=None, limit=20):
+    """Return ``[(id, rank), ...]`` best match first; rank is None on the fallback path."""
+    words = WORD_RE.findall(query)
+    if not words:
+        return []
+    if connection.vendor == 'sqlite':
+        # Quote every word so user input can't inject FTS5 query syntax
+        return _ranked_ids(SQLITE_SEARCH, ' '.join(f'"{word}"' for word in words), verified, limit)
+    if connection.vendor == 'postgresql':
+        return _ranked_ids(POSTGRES_SEARCH, ' '.join(words), verified, limit)
+    return [(entry_id, None) for entry_id in _fallback(words, verified).values_list('id', flat=True)[:limit]]
+
+
+def search(query, verified=None, limit=20):
+    """Return ``[(entry, rank), ...]`` best match first."""
+    ranked = ranked_ids(query, verified, limit)
+    entries = KnowledgeBase.objects.in_bulk([entry_id for entry_id, _ in ranked])
+    return [(entries[entry_id], rank) for entry_id, rank in ranked if entry_id in entries]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import User, Course
+from . import grading
+from .gpa import normalize_grade
+from .models import User, Course, ChatMessage, KnowledgeBase
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
@@ -13,6 +15,24 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'course_name', 'credits', 'letter_grade', 'semester_year']
         read_only_fields = ['user']
 
+    def validate_letter_grade(self, value):
+        grade = normalize_grade(value)
+        if grade not in grading.known_grades():
+            raise serializers.ValidationError('Not a grade on any configured grading scale.')
+        return grade
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'conversation_id', 'role', 'content', 'context', 'created_at']
+        read_only_fields = fields
+
+class KnowledgeBaseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = KnowledgeBase
+        fields = ['id', 'question', 'answer', 'is_verified', 'created_at']
+        read_only_fields = fields
+
 # ADD THIS PART:
 class UserRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,3 +1,1047 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_views, chat, grading, knowledge, metrics, profiling
+from .authentication import CachedJWTAuthentication
+from .pagination import EstimatedCountPaginator
+from .models import (
+    ArchivedConversation, ChatMessage, Course, GradeBand, GradingScale, KnowledgeBase, Semester, SemesterGpaTotals, User, UserGpaTotals, parse_semester,
+)
+
+
+class CalculateGpaBatchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='batch@example.com', username='batch', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_matches_single_endpoint(self):
+        transcripts = [
+            {'grades': ['A', 'b ', 'x'], 'credits': [3, '2', 4]},
+            {'grades': ['C', 'F'], 'credits': [1.5, 3]},
+        ]
+        response = self.client.post('/api/calculate-gpa/batch/', {'transcripts': transcripts}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for transcript, result in zip(transcripts, response.data['results']):
+            single = self.client.post('/api/calculate-gpa/', transcript, format='json').data
+            self.assertEqual(result, single)
+
+    def test_batch_reports_per_transcript_errors(self):
+        transcripts = [
+            {'id': 's1', 'grades': ['A'], 'credits': ['three']},
+            {'id': 's2', 'grades': ['A', 'B'], 'credits': [3]},
+            {'id': 's3', 'grades': ['Z'], 'credits': [3]},
+            {'id': 's4', 'grades': ['B'], 'credits': [2]},
+        ]
+        response = self.client.post('/api/calculate-gpa/batch/', {'transcripts': transcripts}, format='json')
+        results = response.data['results']
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([r['id'] for r in results], ['s1', 's2', 's3', 's4'])
+        self.assertEqual(results[0]['error'], 'Invalid credits')
+        self.assertEqual(results[1]['error'], 'Invalid data')
+        self.assertEqual(results[2]['error'], 'No credits')
+        self.assertEqual(results[3]['gpa'], 4.0)
+
+    def test_batch_isolates_nested_and_infinite_values(self):
+        transcripts = [
+            {'grades': [['A'], 'B'], 'credits': [3, 2]},
+            {'grades': ['A'], 'credits': ['inf']},
+            {'grades': ['B'], 'credits': [2]},
+        ]
+        response = self.client.post('/api/calculate-gpa/batch/', {'transcripts': transcripts}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([r.get('error') for r in results], ['Invalid data', 'Invalid credits', None])
+        single = self.client.post('/api/calculate-gpa/', transcripts[1], format='json')
+        self.assertEqual((single.status_code, single.data['error']), (400, 'Invalid credits'))
+
+    def test_overflowing_and_ungraded_bad_credits_are_rejected_alike(self):
+        transcripts = [{'grades': ['A'], 'credits': [1e308]}, {'grades': ['X', 'A'], 'credits': ['bad', 3]}]
+        results = self.client.post('/api/calculate-gpa/batch/', {'transcripts': transcripts}, format='json').data['results']
+        for transcript, result in zip(transcripts, results):
+            single = self.client.post('/api/calculate-gpa/', transcript, format='json')
+            self.assertEqual((single.status_code, single.data), (400, {'success': False, 'error': 'Invalid credits'}))
+            self.assertEqual(result, single.data)
+
+
+class CourseSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='summary@example.com', username='summary', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='2023 First'),
+            Course(user=self.user, course_name='PHY101', credits=2, letter_grade='c ', semester_year='2023 First'),
+            Course(user=self.user, course_name='CHM102', credits=4, letter_grade='B', semester_year='2023 Second'),
+            Course(user=self.user, course_name='GST102', credits=1, letter_grade='P', semester_year='2023 Second'),
+        ])
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/courses/summary/')
+        self.assertEqual(response.data['cgpa'], round((15 + 6 + 16) / 9, 2))
+        self.assertEqual(response.data['total_credits'], 9.0)
+        self.assertEqual(response.data['course_count'], 4)
+        self.assertEqual(
+            [(s['semester_year'], s['gpa'], s['course_count']) for s in response.data['semesters']],
+            [('2023 First', 4.2, 2), ('2023 Second', 4.0, 2)],
+        )
+
+
+class GpaTotalsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='totals@example.com', username='totals', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def test_totals_follow_viewset_writes(self):
+        first = self.client.post('/api/courses/', {'course_name': 'MTH101', 'credits': '3.0', 'letter_grade': 'A', 'semester_year': 'S1'}).data
+        second = self.client.post('/api/courses/', {'course_name': 'PHY101', 'credits': '2.0', 'letter_grade': 'B', 'semester_year': 'S1'}).data
+        self.client.patch(f"/api/courses/{first['id']}/", {'letter_grade': 'C', 'semester_year': 'S2'})
+        self.client.delete(f"/api/courses/{second['id']}/")
+
+        summary = self.client.get('/api/courses/summary/').data
+        self.assertEqual(summary['cgpa'], 3.0)
+        self.assertEqual([s['semester_year'] for s in summary['semesters']], ['S2'])
+        call_command('rebuild_gpa_totals', '--check', stdout=StringIO())
+
+    def test_single_course_writes_lock_the_row(self):
+        admin = User.objects.create_superuser(email='lock@example.com', username='lock', password='pass12345')
+        first, second, third = (
+            self.client.post('/api/courses/', {'course_name': name, 'credits': '3.0', 'letter_grade': 'A', 'semester_year': 'S1'}).data['id']
+            for name in ('MTH101', 'PHY101', 'CHM101')
+        )
+        with patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update) as lock:
+            self.client.patch(f'/api/courses/{first}/', {'letter_grade': 'B'})
+            self.client.delete(f'/api/courses/{second}/')
+            self.client.force_login(admin)
+            self.client.post(f'/admin/accounts/course/{third}/delete/', {'post': 'yes'})
+        self.assertEqual(lock.call_count, 3)
+        self.assertEqual(list(Course.objects.values_list('letter_grade', flat=True)), ['B'])
+        call_command('rebuild_gpa_totals', '--check', stdout=StringIO())
+
+    def test_semester_is_resolved_only_when_its_name_changes(self):
+        course = Course.objects.create(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='2023 First')
+        course = Course.objects.get(pk=course.pk)
+        course.letter_grade = 'B'
+        with CaptureQueriesContext(connection) as captured:
+            course.save()
+        self.assertFalse(any('accounts_semester' in query['sql'] for query in captured.captured_queries))
+
+        course.semester_year = '2023 Second'
+        course.save(update_fields=['semester_year'])
+        course.refresh_from_db()
+        self.assertEqual((course.semester.year, course.semester.term), (2023, 2))
+
+    def test_rebuild_repairs_drift(self):
+        Course.objects.create(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='S1')
+        with self.assertRaises(CommandError):
+            call_command('rebuild_gpa_totals', '--check', stdout=StringIO())
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+        call_command('rebuild_gpa_totals', '--check', stdout=StringIO())
+        self.assertEqual(SemesterGpaTotals.objects.get(user=self.user).grade_points, 15)
+
+
+class CourseListCachingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='etag@example.com', username='etag', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def test_conditional_get_and_invalidation(self):
+        first = self.client.get('/api/courses/')
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/courses/')
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/courses/', {'course_name': 'MTH101', 'credits': '3.0', 'letter_grade': 'A'})
+        response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 1)
+
+    def test_if_modified_since_alone_never_hides_a_write(self):
+        last_modified = self.client.get('/api/courses/')['Last-Modified']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/courses/', {'course_name': 'MTH101', 'credits': '3.0', 'letter_grade': 'A'})
+        response = self.client.get('/api/courses/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual((response.status_code, len(response.data)), (200, 1))
+
+
+class CoursePaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='pages@example.com', username='pages', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name=f'C{i}', credits=3, letter_grade='A') for i in range(5)
+        ])
+
+    def test_cursor_pages_follow_id_order(self):
+        self.assertEqual(len(self.client.get('/api/courses/').data), 5)
+        page = self.client.get('/api/courses/?page_size=2').data
+        names = [c['course_name'] for c in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).data
+            names += [c['course_name'] for c in page['results']]
+        self.assertEqual(names, ['C4', 'C3', 'C2', 'C1', 'C0'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'query plan text is SQLite specific')
+    def test_list_queries_use_index_order(self):
+        queryset = Course.objects.filter(user=self.user).order_by('-id')
+        for query in (queryset, queryset.filter(id__lt=3)):
+            plan = query.explain()
+            self.assertIn('course_user_id_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class CourseImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='import@example.com', username='import', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content, query=''):
+        return self.client.post(f'/api/courses/import/{query}', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_csv_import_reports_bad_rows(self):
+        content = (
+            'course_name,credits,letter_grade,semester_year\n'
+            'MTH101,3,A,S1\n'
+            'PHY101,abc,B,S1\n'
+            'CHM101,2,B,S1\n'
+        )
+        response = self.upload('courses.csv', content, '?batch_size=1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 3)
+        self.assertIn('credits', response.data['errors'][0]['errors'])
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 4.6)
+
+    def test_strict_ndjson_import_rolls_back(self):
+        content = '{"course_name": "MTH101", "credits": 3, "letter_grade": "A"}\nnot json\n'
+        response = self.upload('courses.ndjson', content, '?strict=true')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'row': 2, 'errors': {'non_field_errors': ['Invalid JSON']}}])
+        self.assertFalse(Course.objects.exists())
+
+    def test_non_utf8_upload_is_rejected(self):
+        lines = ['course_name,credits,letter_grade,semester_year\n'] + [f'CRS{i},3,A,S1\n' for i in range(2000)] + ['Caf\xe9101,3,A,S1\n']
+        upload = SimpleUploadedFile('courses.csv', ''.join(lines).encode('cp1252'))
+        response = self.client.post('/api/courses/import/?batch_size=100', {'file': upload}, format='multipart')
+        self.assertEqual((response.status_code, response.data['error']), (400, 'File must be UTF-8'))
+        self.assertFalse(Course.objects.exists())
+
+
+class CourseBulkChangeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='bulk@example.com', username='bulk', password='pass12345')
+        other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        for name, grade, semester in (('MTH101', 'A', 'S1'), ('PHY101', 'B', 'S1'), ('CHM201', 'C', 'S2')):
+            self.client.post('/api/courses/', {'course_name': name, 'credits': '3.0', 'letter_grade': grade, 'semester_year': semester})
+        self.foreign = Course.objects.create(user=other, course_name='MTH101', credits=3, letter_grade='F', semester_year='S1')
+
+    def test_bulk_update_by_semester(self):
+        response = self.client.post('/api/courses/bulk-update/', {'semester_year': 'S1', 'changes': {'letter_grade': 'C'}}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.letter_grade, 'F')
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 3.0)
+        call_command('rebuild_gpa_totals', '--check', '--user', self.user.id, stdout=StringIO())
+
+    def test_bulk_delete_by_ids(self):
+        ids = list(Course.objects.filter(user=self.user, semester_year='S1').values_list('id', flat=True))
+        response = self.client.post('/api/courses/bulk-delete/', {'ids': ids + [self.foreign.id]}, format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertTrue(Course.objects.filter(id=self.foreign.id).exists())
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 3.0)
+        call_command('rebuild_gpa_totals', '--check', '--user', self.user.id, stdout=StringIO())
+
+    def test_bulk_delete_requires_selector(self):
+        self.assertEqual(self.client.post('/api/courses/bulk-delete/', {}, format='json').status_code, 400)
+        for path in ('/api/courses/bulk-delete/', '/api/courses/bulk-update/'):
+            response = self.client.post(path, {'semester_year': 2023, 'changes': {'letter_grade': 'C'}}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Course.objects.filter(user=self.user).count(), 3)
+
+
+class CourseExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='export@example.com', username='export', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='S1'),
+            Course(user=self.user, course_name='PHY101', credits=2, letter_grade='C', semester_year='S1'),
+            Course(user=self.user, course_name='CHM201', credits=4, letter_grade='B', semester_year='S2'),
+        ])
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+
+    def test_csv_export_with_subtotals(self):
+        response = self.client.get('/api/courses/export/?output=csv&subtotals=true')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,course_name,credits,letter_grade,semester_year,gpa')
+        self.assertEqual(lines[3], ',Semester subtotal,5.0,,S1,4.2')
+        self.assertEqual(lines[-1], ',Cumulative,9.0,,,4.11')
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/courses/export/?output=ndjson')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([r['course_name'] for r in records], ['MTH101', 'PHY101', 'CHM201'])
+        self.assertEqual(records[0]['credits'], 3.0)
+
+
+class ChatHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='chat@example.com', username='chat', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=self.user, conversation_id='c1', role='user' if i % 2 else 'ai', content=f'm{i}')
+            for i in range(5)
+        ] + [ChatMessage(user=self.user, conversation_id='c2', role='user', content='other')])
+
+    def test_history_pages_backwards(self):
+        url = '/api/chat/conversations/c1/messages/'
+        page = self.client.get(f'{url}?limit=2').data
+        contents = [m['content'] for m in page['results']]
+        while page['next_before']:
+            page = self.client.get(f"{url}?limit=2&before={page['next_before']}").data
+            contents = [m['content'] for m in page['results']] + contents
+        self.assertEqual(contents, ['m0', 'm1', 'm2', 'm3', 'm4'])
+
+    def test_conversation_list(self):
+        results = self.client.get('/api/chat/conversations/').data['results']
+        self.assertEqual({r['conversation_id']: r['message_count'] for r in results}, {'c1': 5, 'c2': 1})
+
+    @skipUnless(connection.vendor == 'sqlite', 'query plan text is SQLite specific')
+    def test_history_query_uses_index(self):
+        plan = ChatMessage.objects.filter(user=self.user, conversation_id='c1').order_by('-created_at', '-id')[:50].explain()
+        self.assertIn('chat_user_conv_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ChatArchiveTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='archive@example.com', username='archive', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=self.user, conversation_id='old', role='user', content=f'm{i}') for i in range(4)
+        ])
+        ChatMessage.objects.update(created_at=timezone.now() - timedelta(days=400))
+        ChatMessage.objects.create(user=self.user, conversation_id='new', role='user', content='fresh')
+
+    def test_archived_conversations_read_transparently(self):
+        before = self.client.get('/api/chat/conversations/old/messages/').data['results']
+        call_command('archive_chat_messages', '--older-than-days', '365', '--codec', 'lzma', stdout=StringIO())
+
+        self.assertEqual(ChatMessage.objects.filter(conversation_id='old').count(), 0)
+        self.assertEqual(ArchivedConversation.objects.get().message_count, 4)
+        self.assertEqual(self.client.get('/api/chat/conversations/old/messages/').data['results'], before)
+
+        page = self.client.get('/api/chat/conversations/old/messages/?limit=3').data
+        older = self.client.get(f"/api/chat/conversations/old/messages/?before={page['next_before']}").data
+        self.assertEqual([m['content'] for m in older['results'] + page['results']], ['m0', 'm1', 'm2', 'm3'])
+
+        results = self.client.get('/api/chat/conversations/').data['results']
+        self.assertEqual([(r['conversation_id'], r['message_count']) for r in results], [('new', 1), ('old', 4)])
+
+    def test_messages_after_the_cutoff_stay_hot(self):
+        cutoff = timezone.now() - timedelta(days=365)
+        ChatMessage.objects.create(user=self.user, conversation_id='old', role='ai', content='late reply')
+        self.assertEqual(chat.archive_conversation(self.user.id, 'old', cutoff=cutoff), 4)
+        self.assertEqual(list(ChatMessage.objects.filter(conversation_id='old').values_list('content', flat=True)), ['late reply'])
+        page = self.client.get('/api/chat/conversations/old/messages/').data['results']
+        self.assertEqual([m['content'] for m in page], ['m0', 'm1', 'm2', 'm3', 'late reply'])
+
+    def test_pages_only_open_the_archive_they_need(self):
+        chat.archive_conversation(self.user.id, 'old')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=self.user, conversation_id='old', role='user', content=f'n{i}') for i in range(4)
+        ])
+        chat.archive_conversation(self.user.id, 'old')
+        newer = ArchivedConversation.objects.order_by('-id').first()
+        self.assertEqual((newer.max_message_id - newer.min_message_id, newer.message_count), (3, 4))
+
+        compress, decompress = chat.CODECS['zlib']
+        opened = []
+        with patch.dict(chat.CODECS, {'zlib': (compress, lambda data: opened.append(data) or decompress(data))}):
+            page = self.client.get(f'/api/chat/conversations/old/messages/?limit=2&before={newer.max_message_id}').data
+            self.assertEqual([m['content'] for m in page['results']], ['n1', 'n2'])
+            self.assertEqual(len(opened), 1)
+            older = self.client.get(f"/api/chat/conversations/old/messages/?limit=2&before={page['next_before']}").data
+        self.assertEqual([m['content'] for m in older['results']], ['m3', 'n0'])
+        self.assertEqual(len(opened), 3)
+
+    def test_admin_changelist_does_not_load_payloads(self):
+        chat.archive_conversation(self.user.id, 'old')
+        admin = User.objects.create_superuser(email='root@example.com', username='root', password='pass12345')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/admin/accounts/archivedconversation/')
+        self.assertContains(response, f'<td class="field-compressed_size">{len(ArchivedConversation.objects.get().payload)}</td>', html=True)
+        archive_queries = [query['sql'] for query in captured if 'accounts_archivedconversation' in query['sql']]
+        self.assertTrue(archive_queries)
+        self.assertFalse(any('"payload"' in sql.replace('LENGTH("accounts_archivedconversation"."payload")', '') for sql in archive_queries))
+
+
+class KnowledgeSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='kb@example.com', username='kb', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        KnowledgeBase.objects.create(question='How is CGPA calculated?', answer='Weighted average of grade points.', is_verified=True)
+        KnowledgeBase.objects.create(question='What is a carry-over course?', answer='A failed course retaken; CGPA includes it.')
+        KnowledgeBase.objects.create(question='When does registration close?', answer='Week three.', is_verified=True)
+
+    def test_ranked_search_with_verified_filter(self):
+        results = self.client.get('/api/knowledge/search/?q=cgpa').data['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['question'], 'How is CGPA calculated?')
+        verified = self.client.get('/api/knowledge/search/?q=cgpa&is_verified=true').data['results']
+        self.assertEqual([r['question'] for r in verified], ['How is CGPA calculated?'])
+
+    def test_index_follows_updates_and_deletes(self):
+        entry = KnowledgeBase.objects.get(question__startswith='When')
+        entry.answer = 'It closes after the CGPA review week.'
+        entry.save()
+        KnowledgeBase.objects.filter(question__startswith='How').delete()
+        results = self.client.get('/api/knowledge/search/?q=cgpa').data['results']
+        self.assertEqual({r['question'] for r in results}, {'What is a carry-over course?', 'When does registration close?'})
+        self.assertEqual(self.client.get('/api/knowledge/search/?q="unbalanced').status_code, 200)
+
+    def test_admin_search_is_ranked_and_bounded(self):
+        KnowledgeBase.objects.create(question='Is CGPA the same as CGPA average?', answer='CGPA is the cumulative CGPA.')
+        self.client.force_login(User.objects.create_superuser(email='kbadmin@example.com', username='kbadmin', password='pass12345'))
+        with self.settings(ADMIN_SEARCH_LIMIT=2):
+            results = self.client.get('/admin/accounts/knowledgebase/?q=cgpa').context['cl'].result_list
+        self.assertEqual([entry.question for entry in results][0], 'Is CGPA the same as CGPA average?')
+        self.assertEqual(len(results), 2)
+
+
+class KnowledgeAnswerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        knowledge.answers.clear()
+        self.user = User.objects.create_user(email='answer@example.com', username='answer', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        self.entry = KnowledgeBase.objects.create(question='How is CGPA calculated?', answer='Weighted average.', is_verified=True)
+
+    def test_normalized_lookup_is_cached_and_invalidated(self):
+        response = self.client.get('/api/knowledge/answer/', {'q': '  how IS cgpa calculated '})
+        self.assertEqual(response.data['answer'], 'Weighted average.')
+        with self.assertNumQueries(0):
+            self.client.get('/api/knowledge/answer/', {'q': 'How is CGPA calculated'})
+
+        self.entry.answer = 'Sum of points over credits.'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.entry.save()
+            self.assertEqual(knowledge.answers.get(self.entry.question_hash), 'Weighted average.')
+        self.assertEqual(len(callbacks), 1)
+        response = self.client.get('/api/knowledge/answer/', {'q': 'how is cgpa calculated?'})
+        self.assertEqual(response.data['answer'], 'Sum of points over credits.')
+
+    def test_equivalent_questions_are_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            KnowledgeBase.objects.create(question='how is CGPA calculated', answer='Duplicate')
+        self.assertEqual(knowledge.verified_answer('HOW IS CGPA CALCULATED???'), 'Weighted average.')
+
+
+class KnowledgeSimilarTests(APITestCase):
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir, True)
+        self.settings_override = self.settings(KNOWLEDGE_INDEX_DIR=self.index_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(email='similar@example.com', username='similar', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def test_incremental_build_and_query(self):
+        self.assertEqual(self.client.get('/api/knowledge/similar/?q=gpa').status_code, 503)
+        KnowledgeBase.objects.create(question='How do I calculate my semester GPA?', answer='Points over credits.', is_verified=True)
+        KnowledgeBase.objects.create(question='Where is the exam timetable published?', answer='On the portal.', is_verified=True)
+        KnowledgeBase.objects.create(question='How do I calculate CGPA across semesters?', answer='Unverified.')
+        call_command('build_knowledge_index', '--full', stdout=StringIO())
+
+        results = self.client.get('/api/knowledge/similar/?q=calculating semester gpa&k=2').data['results']
+        self.assertEqual(results[0]['answer'], 'Points over credits.')
+        self.assertEqual(len(results), 1)
+
+        KnowledgeBase.objects.create(question='When is the exam timetable released?', answer='Week ten.', is_verified=True)
+        out = StringIO()
+        call_command('build_knowledge_index', stdout=out)
+        self.assertIn('Indexed 1 new questions (3 total)', out.getvalue())
+        results = self.client.get('/api/knowledge/similar/?q=exam timetable released').data['results']
+        self.assertEqual([r['answer'] for r in results], ['Week ten.', 'On the portal.'])
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='jwt@example.com', username='jwt', password='pass12345')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.payload = {'grades': ['A'], 'credits': [3]}
+        # Compile the grading scales up front so only the user lookup is counted
+        grading.get_scale()
+
+    def test_user_lookup_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.post('/api/calculate-gpa/', self.payload, format='json').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.post('/api/calculate-gpa/', self.payload, format='json').status_code, 200)
+
+    def test_cached_user_fields(self):
+        auth = CachedJWTAuthentication()
+        token = RefreshToken.for_user(self.user).access_token
+        for _ in range(2):
+            user = auth.get_user(token)
+            self.assertEqual((user.pk, user.email, user.username, user.is_staff, user.is_active),
+                             (self.user.pk, 'jwt@example.com', 'jwt', False, True))
+
+    def test_deactivation_invalidates_cached_user(self):
+        self.client.post('/api/calculate-gpa/', self.payload, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.post('/api/calculate-gpa/', self.payload, format='json').status_code, 401)
+
+    def test_login_does_not_invalidate_cached_user(self):
+        self.client.post('/api/calculate-gpa/', self.payload, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.post('/api/calculate-gpa/', self.payload, format='json')
+
+
+class AsyncViewsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='async@example.com', username='async', password='pass12345')
+        self.auth = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='2023 First'),
+            Course(user=self.user, course_name='CHM102', credits=4, letter_grade='B', semester_year='2023 Second'),
+        ])
+        call_command('rebuild_gpa_totals', '--user', self.user.id, stdout=StringIO())
+        self.factory = AsyncRequestFactory()
+        self.headers = {'Authorization': self.auth}
+        self.four_point = GradingScale.objects.get(name='4.0').id
+
+    async def test_reads_match_sync_views(self):
+        for path, view in (('/api/courses/', async_views.course_list),
+                           ('/api/courses/?page_size=1', async_views.course_list),
+                           ('/api/courses/summary/', async_views.course_summary),
+                           (f'/api/courses/summary/?scale={self.four_point}', async_views.course_summary)):
+            expected = (await sync_to_async(self.client.get)(path)).json()
+            cache.clear()
+            response = await view(self.factory.get(path, headers=self.headers))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), expected)
+
+    async def test_calculate_gpa(self):
+        payload = {'grades': ['A', 'b '], 'credits': [3, 2]}
+        request = self.factory.post('/api/calculate-gpa/', payload, content_type='application/json', headers=self.headers)
+        response = await async_views.calculate_gpa_endpoint(request)
+        expected = await sync_to_async(self.client.post)('/api/calculate-gpa/', payload, format='json')
+        self.assertEqual(json.loads(response.content), expected.json())
+        request = self.factory.post('/api/calculate-gpa/', ['A'], content_type='application/json', headers=self.headers)
+        self.assertEqual((await async_views.calculate_gpa_endpoint(request)).status_code, 400)
+
+    async def test_course_list_requires_token(self):
+        response = await async_views.course_list(self.factory.get('/api/courses/'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='metrics@example.com', username='metrics', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def series(self, key):
+        return metrics.snapshot().get(key) or metrics._new_series()
+
+    def test_records_latency_size_and_sql_per_url_name(self):
+        before = self.series('course-list|GET')
+        Course.objects.create(user=self.user, course_name='MTH101', credits=3, letter_grade='A')
+        response = self.client.get('/api/courses/')
+        after = self.series('course-list|GET')
+        self.assertEqual(sum(after['latency']) - sum(before['latency']), 1)
+        self.assertEqual(after['size_sum'] - before['size_sum'], len(response.content))
+        self.assertGreaterEqual(after['queries_sum'] - before['queries_sum'], 1)
+        self.assertGreater(after['sql_seconds'], before['sql_seconds'])
+
+    def test_unknown_methods_share_one_label(self):
+        before = sum(self.series('course-list|other')['latency'])
+        for method in ('FOO', 'BAR'):
+            self.client.generic(method, '/api/courses/')
+        self.assertEqual(sum(self.series('course-list|other')['latency']) - before, 2)
+        self.assertNotIn('course-list|FOO', metrics.snapshot())
+
+    def test_endpoint_requires_staff_or_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.user.is_staff = True
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_request_duration_seconds_bucket{view="metrics",method="GET",le="+Inf"}', response.content.decode())
+
+        self.client.force_authenticate(user=None)
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer scrape-secret')
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    def test_multiprocess_mode_merges_worker_snapshots(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        other = {'calculate_gpa|POST': {**metrics._new_series(), 'queries_sum': 0, 'statuses': {'200': 7}}}
+        with open(f'{directory}/metrics-999999.json', 'w') as handle:
+            json.dump(other, handle)
+        with self.settings(METRICS_MULTIPROC_DIR=directory):
+            local = self.series('calculate_gpa|POST')['statuses'].get('200', 0)
+            merged = metrics.collect()
+        self.assertEqual(merged['calculate_gpa|POST']['statuses']['200'], local + 7)
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, True)
+        self.settings_override = self.settings(
+            PROFILING_ENABLED=True, PROFILE_DIR=self.profile_dir, PROFILE_SECRET='profile-secret', PROFILE_MAX_FILES=2,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='profile@example.com', username='profile', password='pass12345')
+
+    def test_secret_header_profiles_login_and_command_shows_it(self):
+        response = self.client.post('/api/login/', {'email': 'profile@example.com', 'password': 'pass12345'},
+                                    format='json', HTTP_X_PROFILE='profile-secret')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        out = StringIO()
+        call_command('profiles', stdout=out)
+        self.assertIn(profile_id, out.getvalue())
+        self.assertIn('token_obtain_pair', out.getvalue())
+        out = StringIO()
+        call_command('profiles', profile_id, '--limit', '5', stdout=out)
+        self.assertIn('function calls', out.getvalue())
+
+    def test_only_staff_can_trigger_without_secret(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        payload = {'grades': ['A'], 'credits': [3]}
+        response = self.client.post('/api/calculate-gpa/', payload, format='json', HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+
+        self.user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        for _ in range(3):
+            response = self.client.post('/api/calculate-gpa/', payload, format='json', HTTP_X_PROFILE='1')
+            self.assertIn('X-Profile-Id', response)
+        # Rotation keeps the newest PROFILE_MAX_FILES
+        self.assertEqual(len(profiling.profiles()), 2)
+        self.assertEqual(profiling.profiles()[0]['id'], response['X-Profile-Id'])
+
+    def test_disabled_middleware_is_removed(self):
+        with self.settings(PROFILING_ENABLED=False):
+            response = APIClient().post('/api/login/', {'email': 'profile@example.com', 'password': 'pass12345'},
+                                        format='json', HTTP_X_PROFILE='profile-secret')
+        self.assertNotIn('X-Profile-Id', response)
+
+
+class GenerateDatasetTests(APITestCase):
+    def test_generated_dataset_is_consistent(self):
+        call_command('generate_dataset', '--users', '30', '--knowledge', '400', '--batch-size', '80', stdout=StringIO())
+        call_command('rebuild_gpa_totals', '--check', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_cgpa_trajectory', stdout=out)
+        self.assertIn('corrected 0 semester rows', out.getvalue())
+
+        counts = (User.objects.count(), Course.objects.count(), ChatMessage.objects.count())
+        self.assertEqual(counts[0], 30)
+        self.assertEqual(len(set(KnowledgeBase.objects.values_list('question_hash', flat=True))), 400)
+        self.assertGreater(ChatMessage.objects.filter(created_at__lt=timezone.now() - timedelta(days=1)).count(), 0)
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', '--users', '1', stdout=StringIO())
+
+        # Same seed, same rows, whatever the batch size
+        call_command('generate_dataset', '--users', '30', '--knowledge', '5', '--prefix', 'again', stdout=StringIO())
+        self.assertEqual(Course.objects.filter(user__username__startswith='again-').count(), counts[1])
+        self.assertEqual(ChatMessage.objects.filter(user__username__startswith='again-').count(), counts[2])
+        # Knowledge questions already present are skipped rather than colliding
+        self.assertEqual(KnowledgeBase.objects.count(), 405)
+
+
+class QueryBudgetMixin:
+    """``assertMaxQueries`` fails when the block runs more than ``budget`` queries, listing them."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, label=''):
+        with CaptureQueriesContext(connection) as captured:
+            yield
+        if len(captured) > budget:
+            queries = '\n'.join(f"  {query['sql']}" for query in captured.captured_queries)
+            self.fail(f'{label or "block"} ran {len(captured)} queries, budget is {budget}:\n{queries}')
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    # Each page is rendered with several users' rows, so a per-row query blows the budget
+    ADMIN_BUDGETS = {
+        '/admin/accounts/user/': 6,
+        '/admin/accounts/course/': 5,
+        '/admin/accounts/course/?q=budget0%40example.com': 4,
+        '/admin/accounts/chatmessage/': 5,
+        '/admin/accounts/archivedconversation/': 5,
+        '/admin/accounts/knowledgebase/': 5,
+        '/admin/autocomplete/?app_label=accounts&model_name=course&field_name=user&term=budget': 4,
+    }
+    API_BUDGETS = {
+        '/api/courses/': 2,
+        '/api/courses/?page_size=5': 1,
+        '/api/courses/summary/': 1,
+        '/api/courses/trajectory/': 1,
+        '/api/courses/export/': 1,
+        '/api/chat/conversations/': 4,
+        '/api/chat/conversations/c0/messages/': 2,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password='pass12345')
+        for n in range(5):
+            user = User.objects.create_user(email=f'budget{n}@example.com', username=f'budget{n}', password='pass12345')
+            Course.objects.bulk_create([
+                Course(user=user, course_name=f'CRS{i}', credits=3, letter_grade='B', semester_year='2024 First') for i in range(4)
+            ])
+            ChatMessage.objects.bulk_create([
+                ChatMessage(user=user, conversation_id=f'c{i % 2}', role='user', content=f'm{i}') for i in range(4)
+            ])
+            chat.archive_conversation(user.id, 'c1')
+        self.user = user
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+
+    def test_admin_pages(self):
+        self.client.force_login(self.admin)
+        for path, budget in self.ADMIN_BUDGETS.items():
+            with self.subTest(path=path), self.assertMaxQueries(budget, path):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_api_endpoints(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        for path, budget in self.API_BUDGETS.items():
+            with self.subTest(path=path), self.assertMaxQueries(budget, path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads sqlite_stat1')
+    def test_admin_uses_estimated_count_for_large_tables(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Course.objects.create(user=self.user, course_name='NEW', credits=3, letter_grade='A', semester_year='2024 First')
+        with self.settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=10):
+            self.assertEqual(EstimatedCountPaginator(Course.objects.all(), 100).count, 20)
+            self.assertEqual(EstimatedCountPaginator(Course.objects.filter(user=self.user), 100).count, 5)
+        self.assertEqual(EstimatedCountPaginator(Course.objects.all(), 100).count, 21)
+
+
+class GradingScaleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        grading.clear()
+        self.addCleanup(grading.clear)
+        self.user = User.objects.create_user(email='scale@example.com', username='scale', password='pass12345')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.scales = {scale.name: scale.id for scale in GradingScale.objects.all()}
+
+    def gpa(self, grades, credits, scale=None):
+        payload = {'grades': grades, 'credits': credits, **({'scale': scale} if scale else {})}
+        return self.client.post('/api/calculate-gpa/', payload, format='json').json()
+
+    def test_calculator_uses_requested_scale(self):
+        self.assertEqual(self.gpa(['A', 'B'], [3, 1])['gpa'], 4.75)
+        self.assertEqual(self.gpa(['A', 'B'], [3, 1], self.scales['4.0'])['gpa'], 3.75)
+        self.assertEqual(self.gpa(['73', '55'], [1, 1], self.scales['5.0 percentage'])['gpa'], 4.0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.gpa(['A-', 'b+', 'E'], [1, 1, 1], self.scales['4.0 plus/minus'])['gpa'], 3.5)
+
+        batch = self.client.post('/api/calculate-gpa/batch/', {
+            'transcripts': [{'grades': ['A-', 'B+'], 'credits': [1, 1]}], 'scale': self.scales['4.0 plus/minus'],
+        }, format='json').json()
+        self.assertEqual(batch['results'][0]['gpa'], 3.5)
+        response = self.client.post('/api/calculate-gpa/', {'grades': ['A'], 'credits': [3], 'scale': 999}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_object_bodies_are_rejected(self):
+        session_id = self.client.post('/api/whatif/', {}, format='json').json()['session_id']
+        for path in ('/api/calculate-gpa/', '/api/calculate-gpa/batch/', '/api/gpa-plan/', '/api/whatif/', f'/api/whatif/{session_id}/'):
+            response = self.client.post(path, ['A', 'B'], format='json')
+            self.assertEqual((path, response.status_code, response.json()['error']), (path, 400, 'Invalid data'))
+
+    def test_courses_are_checked_and_summarized_on_any_scale(self):
+        course = {'course_name': 'MTH101', 'credits': '3.0', 'semester_year': 'S1'}
+        self.assertEqual(self.client.post('/api/courses/', {**course, 'letter_grade': 'Q'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/courses/', {**course, 'letter_grade': 'a-'}).data['letter_grade'], 'A-')
+        self.client.post('/api/courses/', {**course, 'course_name': 'PHY101', 'letter_grade': 'B'})
+
+        # The default scale has no A-, so only the B counts
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 4.0)
+        plus_minus = self.scales['4.0 plus/minus']
+        self.assertEqual(self.client.get(f'/api/courses/summary/?scale={plus_minus}').data['cgpa'], 3.35)
+        self.assertEqual(self.client.get('/api/courses/summary/?scale=x').status_code, 400)
+
+        response = self.client.get(f'/api/courses/export/?output=ndjson&subtotals=1&scale={plus_minus}')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(lines[-1]['cgpa'], 3.35)
+
+    def test_scale_changes_are_recompiled(self):
+        four = GradingScale.objects.get(id=self.scales['4.0'])
+        band = four.bands.get(grade='A')
+        band.points = '4.3'
+        with self.captureOnCommitCallbacks(execute=True):
+            band.save()
+        self.assertEqual(self.gpa(['A'], [3], four.id)['gpa'], 4.3)
+
+        four.is_default = True
+        with self.captureOnCommitCallbacks(execute=True):
+            four.save()
+        self.assertEqual(GradingScale.objects.filter(is_default=True).get(), four)
+        self.assertEqual(self.gpa(['A'], [3])['gpa'], 4.3)
+
+        # Another worker's edit: only the shared stamp moves
+        GradeBand.objects.filter(scale=four, grade='A').update(points='4.1')
+        cache.incr(grading.VERSION_KEY)
+        self.assertEqual(self.gpa(['A'], [3])['gpa'], 4.3)
+        with self.settings(GRADING_SCALE_RECHECK=0):
+            self.assertEqual(self.gpa(['A'], [3])['gpa'], 4.1)
+
+
+    def test_totals_kept_on_a_previous_default_are_not_served(self):
+        course = {'course_name': 'MTH101', 'credits': 3, 'letter_grade': 'A', 'semester_year': '2023 First'}
+        self.client.post('/api/courses/', course)
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 5.0)
+
+        four = GradingScale.objects.get(id=self.scales['4.0'])
+        four.is_default = True
+        with self.captureOnCommitCallbacks(execute=True):
+            four.save()
+        plan = self.client.post('/api/gpa-plan/', {'remaining_credits': [3], 'target': 4.0}, format='json').data
+        self.assertEqual(plan['current_cgpa'], 4.0)
+        self.client.post('/api/courses/', {**course, 'course_name': 'PHY101', 'letter_grade': 'B'})
+        for query in ('', f'?scale={four.id}'):
+            self.assertEqual(self.client.get(f'/api/courses/summary/{query}').data['cgpa'], 3.5)
+            self.assertEqual(self.client.get(f'/api/courses/trajectory/{query}').data['trajectory'][-1]['cgpa'], 3.5)
+
+        out = StringIO()
+        call_command('rebuild_gpa_totals', stdout=out)
+        self.assertIn('kept on another grading scale', out.getvalue())
+        self.assertEqual(UserGpaTotals.objects.get(user=self.user).scale_fingerprint, grading.get_scale(four.id).fingerprint)
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 3.5)
+
+        # Back on the built-in scale, the totals rebuilt on 4.0 are stale in turn
+        four.is_default = False
+        with self.captureOnCommitCallbacks(execute=True):
+            four.save()
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 4.5)
+
+class GpaPlannerTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='plan@example.com', username='plan', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def plan(self, **payload):
+        return self.client.post('/api/gpa-plan/', payload, format='json')
+
+    def test_plans_from_ad_hoc_history(self):
+        history = {'grades': ['C', 'c '], 'credits': [3, 3]}
+        result = self.plan(**history, remaining_credits=[3, 3], target=3.5).data
+        self.assertEqual((result['current_cgpa'], result['projected_cgpa']), (3.0, 3.5))
+        # B+B costs less effort than A+C for the same points
+        self.assertEqual([course['grade'] for course in result['plan']], ['B', 'B'])
+
+        result = self.plan(**history, remaining_credits=[3, 3], target=4.5).data
+        self.assertEqual((result['feasible'], result['max_cgpa'], result['plan']), (False, 4.0, []))
+
+    def test_plans_from_stored_courses_on_any_scale(self):
+        Course.objects.create(user=self.user, course_name='MTH101', credits=4, letter_grade='B', semester_year='S1')
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+        result = self.plan(remaining_credits=[2, 2], target=4.5).data
+        self.assertEqual([course['grade'] for course in result['plan']], ['A', 'A'])
+        self.assertEqual(result['projected_cgpa'], 4.5)
+
+        plus_minus = GradingScale.objects.get(name='4.0 plus/minus').id
+        result = self.plan(remaining_credits=[2, 2], target=3.15, scale=plus_minus).data
+        self.assertEqual((result['current_cgpa'], result['projected_cgpa']), (3.0, 3.15))
+        self.assertEqual([course['grade'] for course in result['plan']], ['B+', 'B+'])
+
+    def test_many_remaining_courses(self):
+        remaining = [3, 2, 4, 1, 3, 6] * 12
+        result = self.plan(grades=['B'] * 20, credits=[3] * 20, remaining_credits=remaining, target=4.37).data
+        self.assertTrue(result['feasible'])
+        self.assertEqual(len(result['plan']), 72)
+        earned = 4 * 60 + sum(course['points'] * course['credits'] for course in result['plan'])
+        self.assertGreaterEqual(earned / (60 + sum(remaining)), 4.37)
+        self.assertLess(result['projected_cgpa'], 4.39)
+
+    def test_rejects_bad_input(self):
+        self.assertEqual(self.plan(remaining_credits=['x'], target=4).status_code, 400)
+        self.assertEqual(self.plan(remaining_credits=[3], target=5.5).status_code, 400)
+        self.assertEqual(self.plan(remaining_credits=[], target=4).status_code, 400)
+
+
+class WhatIfSessionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='whatif@example.com', username='whatif', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        self.courses = Course.objects.bulk_create([
+            Course(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='S1'),
+            Course(user=self.user, course_name='PHY101', credits=2, letter_grade='C', semester_year='S1'),
+            Course(user=self.user, course_name='CHM102', credits=4, letter_grade='B', semester_year='S2'),
+        ])
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+        self.session = self.client.post('/api/whatif/', {}, format='json').data
+
+    def delta(self, **delta):
+        return self.client.post(f"/api/whatif/{self.session['session_id']}/", delta, format='json')
+
+    def test_session_starts_from_stored_courses(self):
+        summary = self.client.get('/api/courses/summary/').data
+        self.assertEqual({key: self.session[key] for key in summary}, summary)
+        self.assertEqual(len(self.session['courses']), 3)
+
+    def test_deltas_update_running_totals_without_queries(self):
+        with self.assertNumQueries(0):
+            added = self.delta(op='add', letter_grade='a', credits=1, semester_year='S2').data
+        self.assertEqual((added['course'], added['cgpa'], added['course_count']), ('new-1', round(42 / 10, 2), 4))
+        self.assertEqual([(s['semester_year'], s['gpa']) for s in added['semesters']], [('S2', 4.2)])
+
+        mth = str(self.courses[0].id)
+        moved = self.delta(op='change', course=mth, letter_grade='B', semester_year='S2').data
+        self.assertEqual([(s['semester_year'], s['gpa']) for s in moved['semesters']], [('S1', 3.0), ('S2', 4.12)])
+        self.assertEqual(self.delta(op='remove', course='new-1').data['cgpa'], round(34 / 9, 2))
+
+        full = self.client.get(f"/api/whatif/{self.session['session_id']}/").data
+        self.assertEqual(full['cgpa'], round(34 / 9, 2))
+        self.assertEqual(len(full['courses']), 3)
+        # Stored courses are untouched
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], self.session['cgpa'])
+
+    def test_invalid_deltas_and_missing_sessions(self):
+        self.assertEqual(self.delta(op='add', letter_grade='Q', credits=3).status_code, 400)
+        self.assertEqual(self.delta(op='change', course='999', letter_grade='A').status_code, 400)
+        self.assertEqual(self.delta(op='rename').status_code, 400)
+        self.assertEqual(self.delta(op='add', letter_grade='A', credits=3, semester_year=2023).status_code, 400)
+        self.assertEqual(self.delta(op='change', course=str(self.courses[0].id), semester_year=['S1']).status_code, 400)
+
+        other = User.objects.create_user(email='other@example.com', username='other', password='pass12345')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.delta(op='remove', course=str(self.courses[0].id)).status_code, 404)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.delete(f"/api/whatif/{self.session['session_id']}/").status_code, 204)
+        self.assertEqual(self.client.get(f"/api/whatif/{self.session['session_id']}/").status_code, 404)
+
+
+class SemesterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='terms@example.com', username='terms', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, name, grade, credits, semester):
+        data = {'course_name': name, 'credits': credits, 'letter_grade': grade, 'semester_year': semester}
+        return self.client.post('/api/courses/', data).data
+
+    def test_parse_semester(self):
+        self.assertEqual(parse_semester(' 2023/2024  Second Semester'), (2023, 2, '2023/2024 Second Semester'))
+        self.assertEqual(parse_semester('Fall 2023'), (2023, 3, 'Fall 2023'))
+        self.assertEqual(parse_semester('2022.1'), (2022, 1, '2022.1'))
+        self.assertEqual(parse_semester('S2'), (None, 2, 'S2'))
+        self.assertIsNone(parse_semester('  '))
+        self.assertIsNone(parse_semester(2023))
+
+    def test_spellings_share_a_semester_in_chronological_order(self):
+        self.add('CHM102', 'B', '4.0', '2023/2024 Second')
+        self.add('MTH101', 'A', '3.0', '2023 First')
+        raw = self.add('PHY102', 'C', '2.0', '2023 second')
+        self.assertEqual(raw['semester_year'], '2023 second')
+        self.assertEqual(Semester.objects.count(), 2)
+
+        expected = [('2023 First', 5.0, 1), ('2023/2024 Second', 3.67, 2)]
+        for scale in ('', GradingScale.objects.get(name='5.0 percentage').id):
+            summary = self.client.get(f'/api/courses/summary/?scale={scale}').data
+            self.assertEqual([(s['semester_year'], s['gpa'], s['course_count']) for s in summary['semesters']], expected)
+        lines = b''.join(self.client.get('/api/courses/export/?output=csv&subtotals=true').streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[1] for line in lines[1:5]], ['MTH101', 'Semester subtotal', 'CHM102', 'PHY102'])
+
+        response = self.client.post('/api/courses/bulk-update/', {'semester_year': '2023 Second', 'changes': {'letter_grade': 'A'}}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(self.client.get('/api/courses/summary/').data['cgpa'], 5.0)
+
+    def test_rebuild_links_bulk_created_courses(self):
+        Course.objects.bulk_create([
+            Course(user=self.user, course_name='MTH101', credits=3, letter_grade='A', semester_year='S2'),
+            Course(user=self.user, course_name='PHY101', credits=2, letter_grade='C', semester_year='S1'),
+        ])
+        call_command('rebuild_gpa_totals', stdout=StringIO())
+        self.assertFalse(Course.objects.filter(semester__isnull=True).exists())
+        semesters = self.client.get('/api/courses/summary/').data['semesters']
+        self.assertEqual([(s['semester_year'], s['gpa']) for s in semesters], [('S1', 3.0), ('S2', 5.0)])
+
+
+class CgpaTrajectoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='trend@example.com', username='trend', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+        for name, grade, credits, semester in (
+                ('CHM201', 'C', 4, '2024 First'), ('MTH101', 'A', 3, '2023 First'), ('PHY102', 'B', 2, '2023 Second')):
+            self.client.post('/api/courses/', {'course_name': name, 'credits': credits, 'letter_grade': grade, 'semester_year': semester})
+
+    def series(self, query=''):
+        return [(p['semester_year'], p['gpa'], p['cgpa']) for p in self.client.get(f'/api/courses/trajectory/{query}').data['trajectory']]
+
+    def test_writes_update_the_series(self):
+        self.assertEqual(self.series(), [('2023 First', 5.0, 5.0), ('2023 Second', 4.0, 4.6), ('2024 First', 3.0, 3.89)])
+        first = Course.objects.get(course_name='MTH101')
+        self.client.patch(f'/api/courses/{first.id}/', {'letter_grade': 'C'})
+        self.client.delete(f"/api/courses/{Course.objects.get(course_name='PHY102').id}/")
+        self.assertEqual(self.series(), [('2023 First', 3.0, 3.0), ('2024 First', 3.0, 3.0)])
+        plus_minus = GradingScale.objects.get(name='4.0 plus/minus').id
+        self.assertEqual(self.series(f'?scale={plus_minus}'), [('2023 First', 2.0, 2.0), ('2024 First', 2.0, 2.0)])
+
+    def test_only_later_semesters_are_recomputed(self):
+        rows = SemesterGpaTotals.objects.filter(user=self.user)
+        rows.update(cumulative_points=0, cumulative_credits=0)
+        self.client.post('/api/courses/', {'course_name': 'BIO102', 'credits': 2, 'letter_grade': 'A', 'semester_year': '2023 Second'})
+        cumulative = sorted(rows.values_list('semester__year', 'semester__term', 'cumulative_credits'))
+        self.assertEqual([credits for *_, credits in cumulative], [0, 4, 8])
+
+        out = StringIO()
+        call_command('rebuild_cgpa_trajectory', stdout=out)
+        self.assertIn('corrected 3 semester rows', out.getvalue())
+        self.assertEqual(self.series()[-1], ('2024 First', 3.0, 4.09))
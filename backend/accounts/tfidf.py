@@ -0,0 +1,191 @@
+"""
+Offline-built TF-IDF index over verified KnowledgeBase questions.
+
+``manage.py build_knowledge_index`` writes the index as NumPy arrays under
+``KNOWLEDGE_INDEX_DIR``. The term-document matrix is stored column-major
+(one postings list per term), so a query only touches the postings of its
+own terms. Readers memory-map the arrays lazily and pick up a new build by
+watching the ``CURRENT`` pointer file.
+
+Layout of a build directory:
+    meta.json    vocabulary, document count and the created_at watermark
+    ids.npy      KnowledgeBase id of each document row
+    indptr.npy   postings offsets per term (length = terms + 1)
+    docs.npy     document row of each posting
+    tf.npy       sublinear term frequency (1 + log tf) of each posting
+    idf.npy      smoothed inverse document frequency per term
+    norms.npy    L2 norm of each document's tf-idf vector
+"""
+import json
+import os
+import shutil
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import KnowledgeBase, normalize_question
+
+ARRAYS = ('ids', 'indptr', 'docs', 'tf', 'idf', 'norms')
+STOP_WORDS = frozenset(
+    'a an and are as at be by do does for from how i in is it my of on or the to what when where which who why with'.split()
+)
+
+
+def tokenize(text):
+    return [word for word in normalize_question(text).split() if word not in STOP_WORDS]
+
+
+class IndexNotBuilt(Exception):
+    pass
+
+
+# --- Building ---
+
+def _index_dir():
+    return Path(settings.KNOWLEDGE_INDEX_DIR)
+
+
+def _current_build():
+    try:
+        return (_index_dir() / 'CURRENT').read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _load_arrays(build, mmap_mode=None):
+    path = _index_dir() / build
+    meta = json.loads((path / 'meta.json').read_text())
+    arrays = {name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode) for name in ARRAYS}
+    return meta, arrays
+
+
+def _postings(rows, vocabulary, first_doc):
+    """COO (term, doc, tf) arrays for new rows, extending ``vocabulary`` in place."""
+    terms, docs, tfs = [], [], []
+    for offset, (_, question) in enumerate(rows):
+        for word, count in Counter(tokenize(question)).items():
+            terms.append(vocabulary.setdefault(word, len(vocabulary)))
+            docs.append(first_doc + offset)
+            tfs.append(1.0 + np.log(count))
+    return np.array(terms, dtype=np.int64), np.array(docs, dtype=np.int64), np.array(tfs, dtype=np.float32)
+
+
+def build(full=False):
+    """
+    Build or extend the index and return ``(documents_added, total_documents)``.
+
+    Incremental builds only tokenize verified rows created after the previous
+    build's watermark; existing postings are merged without re-reading them
+    from the database. Use ``full=True`` to pick up edits, deletions and rows
+    verified after they were created.
+    """
+    previous = None if full else _current_build()
+    if previous:
+        meta, arrays = _load_arrays(previous)
+        vocabulary = meta['vocabulary']
+        ids = arrays['ids']
+        indptr = arrays['indptr']
+        old_terms = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        old_docs, old_tf = arrays['docs'], arrays['tf']
+        watermark = parse_datetime(meta['watermark']) if meta['watermark'] else None
+    else:
+        vocabulary, ids, watermark = {}, np.empty(0, dtype=np.int64), None
+        old_terms = old_docs = np.empty(0, dtype=np.int64)
+        old_tf = np.empty(0, dtype=np.float32)
+
+    queryset = KnowledgeBase.objects.filter(is_verified=True).order_by('created_at', 'id')
+    if watermark is not None:
+        queryset = queryset.filter(created_at__gte=watermark)
+    # >= plus the id check keeps rows sharing the watermark timestamp from being missed or doubled
+    known = set(ids.tolist())
+    rows, new_watermark = [], watermark
+    for entry_id, question, created_at in queryset.values_list('id', 'question', 'created_at').iterator():
+        new_watermark = created_at
+        if entry_id not in known:
+            rows.append((entry_id, question))
+
+    new_terms, new_docs, new_tf = _postings(rows, vocabulary, len(ids))
+    ids = np.concatenate([ids, np.array([entry_id for entry_id, _ in rows], dtype=np.int64)])
+    terms = np.concatenate([old_terms, new_terms])
+    docs = np.concatenate([old_docs, new_docs])
+    tf = np.concatenate([old_tf, new_tf])
+
+    order = np.argsort(terms, kind='stable')
+    terms, docs, tf = terms[order], docs[order], tf[order]
+    df = np.bincount(terms, minlength=len(vocabulary))
+    indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+    idf = (np.log((1.0 + len(ids)) / (1.0 + df)) + 1.0).astype(np.float32)
+    norms = np.sqrt(np.bincount(docs, weights=(tf * idf[terms]) ** 2, minlength=len(ids))).astype(np.float32)
+
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    path = _index_dir() / stamp
+    path.mkdir(parents=True)
+    for name, array in (('ids', ids), ('indptr', indptr), ('docs', docs), ('tf', tf), ('idf', idf), ('norms', norms)):
+        np.save(path / f'{name}.npy', array)
+    (path / 'meta.json').write_text(json.dumps({
+        'vocabulary': vocabulary,
+        'documents': len(ids),
+        'watermark': new_watermark.isoformat() if new_watermark else None,
+    }))
+
+    # Swap the pointer atomically; readers holding the old arrays keep their mappings
+    pointer = _index_dir() / 'CURRENT.tmp'
+    pointer.write_text(stamp)
+    os.replace(pointer, _index_dir() / 'CURRENT')
+    for old in _index_dir().iterdir():
+        if old.is_dir() and old.name not in (stamp, previous):
+            shutil.rmtree(old, ignore_errors=True)
+    return len(rows), len(ids)
+
+
+# --- Querying ---
+
+_loaded = None
+_lock = threading.Lock()
+
+
+def _index():
+    global _loaded
+    build_name = _current_build()
+    if build_name is None:
+        raise IndexNotBuilt()
+    index = _loaded
+    if index is None or index['build'] != build_name:
+        with _lock:
+            if _loaded is None or _loaded['build'] != build_name:
+                meta, arrays = _load_arrays(build_name, mmap_mode='r')
+                # Replaced wholesale so concurrent readers never see a half-loaded index
+                _loaded = {**arrays, 'vocabulary': meta['vocabulary'], 'build': build_name}
+            index = _loaded
+    return index
+
+
+def similar(text, k=5):
+    """Top ``k`` verified entries by cosine similarity: ``[(entry, score), ...]``."""
+    index = _index()
+    counts = Counter(term for term in (index['vocabulary'].get(word) for word in tokenize(text)) if term is not None)
+    if not counts or not len(index['ids']):
+        return []
+
+    terms = np.fromiter(counts, dtype=np.int64)
+    weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))) * index['idf'][terms]
+    scores = np.zeros(len(index['ids']), dtype=np.float32)
+    for term, weight in zip(terms, weights):
+        start, end = index['indptr'][term], index['indptr'][term + 1]
+        # Each document appears at most once per postings list, so plain fancy indexing is safe
+        scores[index['docs'][start:end]] += index['tf'][start:end] * weight
+    scores /= np.maximum(index['norms'], 1e-12) * np.linalg.norm(weights)
+
+    # Over-fetch so rows deleted or unverified since the build can be skipped
+    candidates = min(len(scores), k * 2)
+    top = np.argpartition(-scores, candidates - 1)[:candidates]
+    top = top[np.argsort(-scores[top])]
+    top = top[scores[top] > 0]
+    ids = index['ids'][top].tolist()
+    entries = KnowledgeBase.objects.filter(id__in=ids, is_verified=True).in_bulk()
+    return [(entries[entry_id], float(score)) for entry_id, score in zip(ids, scores[top]) if entry_id in entries][:k]
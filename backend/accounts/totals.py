@@ -0,0 +1,283 @@
+"""
+Denormalized per-user and per-semester GPA running totals.
+
+Every write path that touches Course rows (the viewset, the admin and the
+bulk endpoints) reports its changes here so that summaries can be read
+without scanning the user's courses. The totals are kept on the default
+grading scale and stamped with its fingerprint; summaries on any other scale,
+or over totals stamped for a default scale that has since changed, aggregate
+the rows instead. Writes leave such stale totals alone until ``manage.py
+rebuild_gpa_totals``, which verifies the tables against the raw rows and
+repairs any drift, rebuilds them on the current default.
+
+Each semester row also carries the cumulative totals through that semester,
+which make up the user's CGPA trajectory. A write recomputes them only from
+the earliest semester it touched onwards; ``manage.py
+rebuild_cgpa_trajectory`` recomputes them in full for backfills.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F
+
+from . import grading
+from .gpa import aggregate_courses, normalize_grade, summarize, trajectory
+from .models import Course, Semester, SemesterGpaTotals, UserGpaTotals, semester_order
+
+# Chronological order of the rows holding a ``semester`` foreign key, courses without one first
+CHRONOLOGICAL = tuple(F(field).asc(nulls_first=True) for field in ('semester__year', 'semester__term', 'semester__label'))
+TRAJECTORY_FIELDS = ('cumulative_points', 'cumulative_credits')
+
+
+def course_contribution(course, scale):
+    """Return the (grade_points, credits) a course adds to totals on ``scale``."""
+    points = scale.points.get(normalize_grade(course.letter_grade or ''))
+    if points is None:
+        return Decimal(0), Decimal(0)
+    credits = Decimal(str(course.credits))
+    return points * credits, credits
+
+
+def _add(model, lookup, fingerprint, points, credits, count):
+    """Add to the row at ``lookup``; False when it holds totals kept on another scale."""
+    changes = {
+        'grade_points': F('grade_points') + points,
+        'credits': F('credits') + credits,
+        'course_count': F('course_count') + count,
+    }
+    if model.objects.filter(**lookup, scale_fingerprint=fingerprint).update(**changes):
+        return True
+    row, _ = model.objects.get_or_create(**lookup, defaults={'scale_fingerprint': fingerprint})
+    if row.scale_fingerprint != fingerprint:
+        return False
+    model.objects.filter(**lookup).update(**changes)
+    return True
+
+
+def _mark_stale(user_id):
+    # A blank fingerprint never matches, so the rows stay stale even if the old default returns
+    UserGpaTotals.objects.filter(user_id=user_id).update(scale_fingerprint='')
+    SemesterGpaTotals.objects.filter(user_id=user_id).update(scale_fingerprint='')
+
+
+def apply_changes(user_id, removed=(), added=()):
+    """
+    Subtract ``removed`` courses and add ``added`` courses to a user's totals.
+
+    Courses only need ``semester_id``, ``letter_grade`` and ``credits``, so
+    unsaved snapshots of a row's previous state work for updates.
+    """
+    scale = grading.get_scale()
+    deltas = defaultdict(lambda: [Decimal(0), Decimal(0), 0])
+    for sign, courses in ((-1, removed), (1, added)):
+        for course in courses:
+            points, credits = course_contribution(course, scale)
+            delta = deltas[course.semester_id]
+            delta[0] += sign * points
+            delta[1] += sign * credits
+            delta[2] += sign
+
+    deltas = {semester: delta for semester, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        # The user row goes first so that its row lock serializes the trajectory refresh
+        current = _add(
+            UserGpaTotals,
+            {'user_id': user_id},
+            scale.fingerprint,
+            sum(delta[0] for delta in deltas.values()),
+            sum(delta[1] for delta in deltas.values()),
+            sum(delta[2] for delta in deltas.values()),
+        )
+        for semester_id, (points, credits, count) in deltas.items():
+            current = current and _add(
+                SemesterGpaTotals, {'user_id': user_id, 'semester_id': semester_id}, scale.fingerprint, points, credits, count,
+            )
+        if not current:
+            _mark_stale(user_id)
+            return
+        refresh_trajectory(user_id, deltas.keys())
+
+
+def _chronological(rows):
+    """Sort one user's SemesterGpaTotals rows (with ``semester`` loaded) into chronological order."""
+    return sorted(rows, key=lambda row: (
+        row.semester_id is not None,
+        semester_order(row.semester.year, row.semester.term, row.semester.label) if row.semester_id else (),
+    ))
+
+
+def _accumulate(rows, start=0):
+    """Recompute the cumulative totals of ordered ``rows`` from index ``start``; returns the rows that changed."""
+    points, credits = (rows[start - 1].cumulative_points, rows[start - 1].cumulative_credits) if start else (0, 0)
+    changed = []
+    for row in rows[start:]:
+        points += row.grade_points
+        credits += row.credits
+        if (row.cumulative_points, row.cumulative_credits) != (points, credits):
+            row.cumulative_points, row.cumulative_credits = points, credits
+            changed.append(row)
+    return changed
+
+
+def refresh_trajectory(user_id, semester_ids=None):
+    """
+    Recompute a user's cumulative totals from the earliest of ``semester_ids``
+    onwards, or for every semester when None.
+    """
+    rows = _chronological(SemesterGpaTotals.objects.filter(user_id=user_id).select_related('semester'))
+    start = 0 if semester_ids is None else min(
+        (index for index, row in enumerate(rows) if row.semester_id in semester_ids), default=len(rows),
+    )
+    changed = _accumulate(rows, start)
+    if changed:
+        SemesterGpaTotals.objects.bulk_update(changed, TRAJECTORY_FIELDS)
+
+
+def rebuild_trajectories(user_ids):
+    """Recompute every cumulative total of the given users; returns the number of rows corrected."""
+    by_user = defaultdict(list)
+    for row in SemesterGpaTotals.objects.filter(user_id__in=user_ids).select_related('semester'):
+        by_user[row.user_id].append(row)
+    changed = [row for rows in by_user.values() for row in _accumulate(_chronological(rows))]
+    SemesterGpaTotals.objects.bulk_update(changed, TRAJECTORY_FIELDS, batch_size=1000)
+    return len(changed)
+
+
+def expected_totals(courses):
+    """Recompute per-semester totals for a Course queryset straight from the rows."""
+    expected = defaultdict(dict)
+    for row in aggregate_courses(courses, grading.get_scale(), group_by=('user_id', 'semester_id')):
+        expected[row['user_id']][row['semester_id']] = (row['points'], row['credits'], row['courses'])
+    return expected
+
+
+def stored_totals(user_ids):
+    stored = defaultdict(dict)
+    rows = SemesterGpaTotals.objects.filter(user_id__in=user_ids)
+    for row in rows.values_list('user_id', 'semester_id', 'grade_points', 'credits', 'course_count'):
+        if any(row[2:]):
+            stored[row[0]][row[1]] = tuple(row[2:])
+    return stored
+
+
+def rebuild_user(user_id, semesters):
+    """Replace a user's totals with ``semesters`` ({semester_id: (points, credits, count)})."""
+    fingerprint = grading.get_scale().fingerprint
+    with transaction.atomic():
+        SemesterGpaTotals.objects.filter(user_id=user_id).delete()
+        SemesterGpaTotals.objects.bulk_create([
+            SemesterGpaTotals(user_id=user_id, semester_id=semester_id, grade_points=points, credits=credits, course_count=count,
+                              scale_fingerprint=fingerprint)
+            for semester_id, (points, credits, count) in semesters.items()
+        ])
+        refresh_trajectory(user_id)
+        UserGpaTotals.objects.update_or_create(user_id=user_id, defaults={
+            'scale_fingerprint': fingerprint,
+            'grade_points': sum((totals[0] for totals in semesters.values()), Decimal(0)),
+            'credits': sum((totals[1] for totals in semesters.values()), Decimal(0)),
+            'course_count': sum(totals[2] for totals in semesters.values()),
+        })
+
+
+def link_semesters(courses):
+    """
+    Set the normalized semester of rows in a Course queryset that lack one,
+    such as rows written with bulk_create; returns the number linked.
+    """
+    unlinked = courses.filter(semester__isnull=True).exclude(semester_year__isnull=True).exclude(semester_year='')
+    linked = 0
+    for name in unlinked.order_by().values_list('semester_year', flat=True).distinct():
+        semester = Semester.objects.resolve(name)
+        if semester is not None:
+            linked += unlinked.filter(semester_year=name).update(semester=semester)
+    return linked
+
+
+def _summary_rows(user):
+    return SemesterGpaTotals.objects.filter(user=user, course_count__gt=0).select_related('semester').order_by(*CHRONOLOGICAL)
+
+
+def _summary(rows):
+    return summarize(
+        {'semester_year': row.semester and row.semester.label, 'points': row.grade_points, 'credits': row.credits, 'courses': row.course_count}
+        for row in rows
+    )
+
+
+def _semester_rows(rows):
+    """Label aggregate_courses rows grouped by ``semester_id`` and put them in chronological order."""
+    semesters = Semester.objects.in_bulk([row['semester_id'] for row in rows if row['semester_id'] is not None])
+    labelled = [(semesters.get(row['semester_id']), row) for row in rows]
+    labelled.sort(key=lambda pair: (pair[0] is not None, pair[0] and semester_order(pair[0].year, pair[0].term, pair[0].label)))
+    return [{**row, 'semester_year': semester and semester.label} for semester, row in labelled]
+
+
+def _current(rows, scale):
+    """Whether stored totals ``rows`` were kept on ``scale``."""
+    return all(row.scale_fingerprint == scale.fingerprint for row in rows)
+
+
+def cumulative_totals(user, scale):
+    """(grade_points, graded_credits) of all a user's courses on ``scale``."""
+    if scale is grading.get_scale():
+        row = UserGpaTotals.objects.filter(user=user).only('grade_points', 'credits', 'scale_fingerprint').first()
+        if row is None:
+            return Decimal(0), Decimal(0)
+        if _current([row], scale):
+            return row.grade_points, row.credits
+    rows = list(aggregate_courses(Course.objects.filter(user=user), scale))
+    return sum((row['points'] for row in rows), Decimal(0)), sum((row['credits'] for row in rows), Decimal(0))
+
+
+def read_summary(user, scale=None):
+    """
+    Summary payload on ``scale``, from the running totals (no Course scan)
+    when that is the default scale and they were kept on it.
+    """
+    default = grading.get_scale()
+    if scale is None or scale is default:
+        rows = list(_summary_rows(user))
+        if _current(rows, default):
+            return _summary(rows)
+        scale = default
+    return summarize(_semester_rows(list(aggregate_courses(Course.objects.filter(user=user), scale))))
+
+
+async def aread_summary(user, scale=None):
+    default = await grading.aget_scale()
+    if scale is None or scale is default:
+        rows = [row async for row in _summary_rows(user)]
+        if _current(rows, default):
+            return _summary(rows)
+        scale = default
+    rows = [row async for row in aggregate_courses(Course.objects.filter(user=user), scale)]
+    return summarize(await sync_to_async(_semester_rows)(rows))
+
+
+def read_trajectory(user, scale=None):
+    """
+    CGPA after each semester on ``scale``, read from the stored cumulative
+    totals when that is the default scale and they were kept on it.
+    """
+    default = grading.get_scale()
+    if scale is None or scale is default:
+        rows = _chronological(_summary_rows(user))
+        if _current(rows, default):
+            return trajectory(
+                {'semester_year': row.semester and row.semester.label, 'points': row.grade_points, 'credits': row.credits,
+                 'cumulative_points': row.cumulative_points, 'cumulative_credits': row.cumulative_credits}
+                for row in rows
+            )
+        scale = default
+    rows = _semester_rows(list(aggregate_courses(Course.objects.filter(user=user), scale)))
+    points = credits = Decimal(0)
+    for row in rows:
+        points += row['points']
+        credits += row['credits']
+        row.update(cumulative_points=points, cumulative_credits=credits)
+    return trajectory(rows)
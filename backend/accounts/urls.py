@@ -1,9 +1,21 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserRegistrationView,
     CourseViewSet,
     calculate_gpa_endpoint, # Keep this!
+    calculate_gpa_batch_endpoint,
+    gpa_plan_endpoint,
+    grading_scales,
+    whatif_session,
+    whatif_sessions,
+    chat_conversations,
+    chat_history,
+    knowledge_answer,
+    knowledge_search,
+    knowledge_similar,
+    metrics_endpoint,
     health_check
 )
 from rest_framework_simplejwt.views import (
@@ -14,6 +26,18 @@ from rest_framework_simplejwt.views import (
 router = DefaultRouter()
 router.register(r'courses', CourseViewSet, basename='course')
 
+# Async read paths for ASGI deployments; they shadow the router's routes below
+async_patterns = []
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    calculate_gpa_endpoint = async_views.calculate_gpa_endpoint
+    health_check = async_views.health_check
+    async_patterns = [
+        path('courses/', async_views.course_list, name='course-list'),
+        path('courses/summary/', async_views.course_summary, name='course-summary'),
+    ]
+
 urlpatterns = [
     # Auth
     path('register/', UserRegistrationView.as_view(), name='register'),
@@ -22,10 +46,26 @@ urlpatterns = [
 
     # Tools & Logic
     path('calculate-gpa/', calculate_gpa_endpoint, name='calculate_gpa'),
+    path('calculate-gpa/batch/', calculate_gpa_batch_endpoint, name='calculate_gpa_batch'),
+    path('gpa-plan/', gpa_plan_endpoint, name='gpa_plan'),
+    path('grading-scales/', grading_scales, name='grading_scales'),
+    path('whatif/', whatif_sessions, name='whatif_sessions'),
+    path('whatif/<str:session_id>/', whatif_session, name='whatif_session'),
+
+    # Chat history
+    path('chat/conversations/', chat_conversations, name='chat_conversations'),
+    path('chat/conversations/<str:conversation_id>/messages/', chat_history, name='chat_history'),
+
+    # Knowledge base
+    path('knowledge/search/', knowledge_search, name='knowledge_search'),
+    path('knowledge/answer/', knowledge_answer, name='knowledge_answer'),
+    path('knowledge/similar/', knowledge_similar, name='knowledge_similar'),
 
     # Maintenance & Health
     path('health/', health_check, name='health_check'),
+    path('metrics/', metrics_endpoint, name='metrics'),
 
     # Viewsets
+    *async_patterns,
     path('', include(router.urls)),
 ]
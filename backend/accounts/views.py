@@ -1,8 +1,21 @@
+from copy import copy
+from decimal import Decimal
+
 from rest_framework import generics, permissions, serializers, viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
-from .models import User, Course
-from .serializers import CourseSerializer, UserRegistrationSerializer
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from . import caching, chat, exports, grading, imports, knowledge, metrics, planner, search, tfidf, totals, whatif
+from .authentication import CachedJWTAuthentication, MetricsTokenAuthentication
+from .gpa import batch_gpa, transcript_gpa
+from .models import User, Course, Semester
+from .pagination import OptInCursorPagination
+from .serializers import CourseSerializer, KnowledgeBaseSerializer, UserRegistrationSerializer
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -33,39 +46,372 @@ class UserRegistrationView(generics.CreateAPIView):
 class CourseViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CourseSerializer
+    pagination_class = OptInCursorPagination
 
     def get_queryset(self):
-        return Course.objects.filter(user=self.request.user).order_by('-id')
+        queryset = Course.objects.filter(user=self.request.user).order_by('-id')
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # Held until commit, so concurrent writes can't both subtract the row's old values from the totals
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        version, modified = caching.course_version(request.user.id)
+        etag = caching.course_list_etag(request, version)
+        # Only the ETag validates: If-Modified-Since has one-second granularity and would
+        # answer 304 for a write made within the same second
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = caching.get_course_list(request, version)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                caching.set_course_list(request, version, data)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        course = serializer.save(user=self.request.user)
+        totals.apply_changes(self.request.user.id, added=[course])
+        caching.bump_course_version(self.request.user.id)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous = copy(serializer.instance)
+        course = serializer.save()
+        totals.apply_changes(self.request.user.id, removed=[previous], added=[course])
+        caching.bump_course_version(self.request.user.id)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        totals.apply_changes(self.request.user.id, removed=[instance])
+        instance.delete()
+        caching.bump_course_version(self.request.user.id)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        try:
+            scale = grading.get_scale(request.query_params.get('scale'))
+        except grading.UnknownScale:
+            return _unknown_scale()
+        return Response(totals.read_summary(request.user, scale))
+
+    @action(detail=False, methods=['get'])
+    def trajectory(self, request):
+        try:
+            scale = grading.get_scale(request.query_params.get('scale'))
+        except grading.UnknownScale:
+            return _unknown_scale()
+        return Response(totals.read_trajectory(request.user, scale))
+
+    def _bulk_queryset(self, data):
+        """Courses selected by an ``ids`` list or a ``semester_year`` filter, or None."""
+        queryset = self.get_queryset().order_by()
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+                return None
+            return queryset.filter(id__in=ids)
+        if 'semester_year' in data:
+            if data['semester_year'] in (None, ''):
+                return queryset.filter(semester__isnull=True)
+            if not isinstance(data['semester_year'], str):
+                return None
+            # Every spelling of the semester, through the (user, semester) index
+            return queryset.filter(semester__in=Semester.objects.matching(data['semester_year']))
+        return None
+
+    @staticmethod
+    def _snapshots(queryset):
+        fields = ('semester_id', 'letter_grade', 'credits')
+        return [Course(**dict(zip(fields, row))) for row in queryset.values_list(*fields)]
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        queryset = self._bulk_queryset(request.data)
+        if queryset is None:
+            return Response({'success': False, 'error': 'Provide a list of ids or a semester_year'}, status=400)
+        serializer = self.get_serializer(data=request.data.get('changes') or {}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data
+        if not changes:
+            return Response({'success': False, 'error': 'No changes given'}, status=400)
+
+        with transaction.atomic():
+            affects_totals = changes.keys() & {'semester_year', 'letter_grade', 'credits'}
+            previous = self._snapshots(queryset.select_for_update()) if affects_totals else []
+            if 'semester_year' in changes:
+                changes = {**changes, 'semester': Semester.objects.resolve(changes['semester_year'])}
+            updated = queryset.update(**changes)
+            if previous:
+                current = [copy(course) for course in previous]
+                for course in current:
+                    for field, value in changes.items():
+                        setattr(course, field, value)
+                totals.apply_changes(request.user.id, removed=previous, added=current)
+            if updated:
+                caching.bump_course_version(request.user.id)
+        return Response({'success': True, 'updated': updated})
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        queryset = self._bulk_queryset(request.data)
+        if queryset is None:
+            return Response({'success': False, 'error': 'Provide a list of ids or a semester_year'}, status=400)
+
+        with transaction.atomic():
+            previous = self._snapshots(queryset.select_for_update())
+            deleted, _ = queryset.delete()
+            totals.apply_changes(request.user.id, removed=previous)
+            if deleted:
+                caching.bump_course_version(request.user.id)
+        return Response({'success': True, 'deleted': deleted})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # ?output= rather than ?format=, which DRF reserves for renderer selection
+        output = request.query_params.get('output', 'csv').lower()
+        if output not in exports.FORMATS:
+            return Response({'success': False, 'error': 'Unsupported output, use csv or ndjson'}, status=400)
+        subtotals = request.query_params.get('subtotals', '').lower() in ('1', 'true')
+        try:
+            scale = grading.get_scale(request.query_params.get('scale'))
+        except grading.UnknownScale:
+            return _unknown_scale()
+        stream = exports.stream_csv if output == 'csv' else exports.stream_ndjson
+
+        response = StreamingHttpResponse(
+            stream(self.get_queryset(), subtotals, settings.COURSE_EXPORT_CHUNK_SIZE, scale),
+            content_type=exports.FORMATS[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="transcript.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'success': False, 'error': 'No file uploaded'}, status=400)
+        file_format = imports.detect_format(upload, request.data.get('format'))
+        if file_format is None:
+            return Response({'success': False, 'error': 'Unsupported format, use csv or ndjson'}, status=400)
+        try:
+            batch_size = int(request.query_params.get('batch_size', settings.COURSE_IMPORT_BATCH_SIZE))
+        except ValueError:
+            return Response({'success': False, 'error': 'Invalid batch_size'}, status=400)
+        batch_size = max(1, min(batch_size, settings.COURSE_IMPORT_MAX_BATCH_SIZE))
+        strict = request.query_params.get('strict', '').lower() in ('1', 'true')
+
+        with transaction.atomic():
+            try:
+                created, failed, errors = imports.import_courses(request.user, imports.read_rows(upload, file_format), batch_size)
+            except UnicodeDecodeError:
+                # Raised mid-stream, so drop the batches already written
+                transaction.set_rollback(True)
+                return Response({'success': False, 'error': 'File must be UTF-8'}, status=400)
+            if strict and failed:
+                transaction.set_rollback(True)
+                created = 0
+            elif created:
+                caching.bump_course_version(request.user.id)
+
+        payload = {'success': not (strict and failed), 'created': created, 'failed': failed, 'errors': errors}
+        return Response(payload, status=400 if strict and failed else 201)
+
+def _unknown_scale():
+    return Response({'success': False, 'error': 'Unknown grading scale'}, status=400)
+
+def _invalid_data():
+    return Response({'success': False, 'error': 'Invalid data'}, status=400)
+
+@api_view(['GET'])
+def grading_scales(request):
+    return Response({'results': [
+        {
+            'id': scale.id,
+            'name': scale.name,
+            'is_default': scale is grading.get_scale(),
+            'bands': [
+                {'grade': grade, 'points': float(points), 'min_percent': None if min_percent is None else float(min_percent)}
+                for grade, points, min_percent in scale.bands
+            ],
+        }
+        for scale in grading.all_scales()
+    ]})
 
 @api_view(['POST'])
 def calculate_gpa_endpoint(request):
+    if not isinstance(request.data, dict):
+        return _invalid_data()
     try:
-        grades = request.data.get('grades', [])
-        credits = request.data.get('credits', [])
-        if not grades or not credits or len(grades) != len(credits):
-            return Response({'success': False, 'error': 'Invalid data'}, status=400)
-
-        grade_points = {'A':5.0,'B':4.0,'C':3.0,'D':2.0,'E':1.0,'F':0.0}
-        total_points = 0
-        total_credits = 0
-
-        for grade, credit in zip(grades, credits):
-            grade_upper = grade.upper().strip()
-            if grade_upper in grade_points:
-                total_points += grade_points[grade_upper]*float(credit)
-                total_credits += float(credit)
-
-        if total_credits == 0:
-            return Response({'success': False, 'error': 'No credits'}, status=400)
-
-        gpa = total_points / total_credits
-        return Response({'success': True, 'gpa': round(gpa,2), 'total_credits': total_credits})
+        scale = grading.get_scale(request.data.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    try:
+        result = transcript_gpa(request.data.get('grades', []), request.data.get('credits', []), scale)
+        return Response(result, status=200 if result['success'] else 400)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
+@api_view(['POST'])
+def calculate_gpa_batch_endpoint(request):
+    transcripts = request.data.get('transcripts') if isinstance(request.data, dict) else None
+    if not isinstance(transcripts, list) or not transcripts:
+        return _invalid_data()
+
+    max_transcripts = settings.GPA_BATCH_MAX_TRANSCRIPTS
+    if len(transcripts) > max_transcripts:
+        return Response({'success': False, 'error': f'Too many transcripts (max {max_transcripts})'}, status=400)
+
+    try:
+        scale = grading.get_scale(request.data.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    results = batch_gpa(transcripts, scale)
+    failed = sum(1 for result in results if not result['success'])
+    return Response({'success': True, 'count': len(results), 'failed': failed, 'results': results})
+
+@api_view(['POST'])
+def gpa_plan_endpoint(request):
+    data = request.data
+    if not isinstance(data, dict):
+        return _invalid_data()
+    try:
+        scale = grading.get_scale(data.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    try:
+        # An ad-hoc transcript like calculate-gpa takes, else the caller's stored courses
+        if 'grades' in data:
+            history = planner.history_totals(data['grades'], data.get('credits'), scale)
+        elif request.user.is_authenticated:
+            history = totals.cumulative_totals(request.user, scale)
+        else:
+            history = (Decimal(0), Decimal(0))
+        result = planner.plan(*history, data.get('remaining_credits'), data.get('target'), scale)
+    except planner.InvalidPlan as exc:
+        return Response({'success': False, 'error': str(exc)}, status=400)
+    return Response(result)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def whatif_sessions(request):
+    if not isinstance(request.data, dict):
+        return _invalid_data()
+    try:
+        scale = grading.get_scale(request.data.get('scale'))
+    except grading.UnknownScale:
+        return _unknown_scale()
+    session_id, state = whatif.create(request.user, scale)
+    payload = {'success': True, 'session_id': session_id, 'expires_in': settings.WHATIF_SESSION_TIMEOUT, **whatif.summary(state)}
+    return Response(payload, status=201)
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def whatif_session(request, session_id):
+    if request.method == 'DELETE':
+        whatif.delete(request.user.id, session_id)
+        return Response(status=204)
+    try:
+        if request.method == 'GET':
+            return Response(whatif.summary(whatif.load(request.user.id, session_id)))
+        key, state, semesters = whatif.apply(request.user.id, session_id, request.data)
+    except whatif.SessionNotFound:
+        return Response({'success': False, 'error': 'Session not found or expired'}, status=404)
+    except grading.UnknownScale:
+        return _unknown_scale()
+    except whatif.InvalidDelta as exc:
+        return Response({'success': False, 'error': str(exc)}, status=400)
+    return Response({'success': True, 'course': key, **whatif.summary(state, semesters)})
+
+def _bounded_int(value, default, maximum):
+    try:
+        return max(1, min(int(value), maximum)) if value is not None else default
+    except ValueError:
+        return default
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def chat_conversations(request):
+    limit = _bounded_int(request.query_params.get('limit'), 50, 200)
+    return Response({'results': chat.conversations(request.user, limit)})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def chat_history(request, conversation_id):
+    limit = _bounded_int(request.query_params.get('limit'), 50, 200)
+    before = request.query_params.get('before')
+    if before is not None and not before.isdigit():
+        return Response({'success': False, 'error': 'Invalid before'}, status=400)
+    try:
+        messages, next_before = chat.conversation_page(request.user, conversation_id, before and int(before), limit)
+    except chat.MessageNotFound:
+        return Response({'success': False, 'error': 'Message not found'}, status=404)
+    return Response({'results': messages, 'next_before': next_before})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def knowledge_search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    verified = request.query_params.get('is_verified')
+    if verified is not None:
+        verified = verified.lower() in ('1', 'true')
+    limit = _bounded_int(request.query_params.get('limit'), 20, 100)
+
+    results = [
+        {**KnowledgeBaseSerializer(entry).data, 'rank': rank}
+        for entry, rank in search.search(query, verified=verified, limit=limit)
+    ]
+    return Response({'results': results})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def knowledge_answer(request):
+    question = request.query_params.get('q', '').strip()
+    if not question:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    answer = knowledge.verified_answer(question)
+    if answer is None:
+        return Response({'success': False, 'error': 'No verified answer'}, status=404)
+    return Response({'success': True, 'answer': answer})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def knowledge_similar(request):
+    question = request.query_params.get('q', '').strip()
+    if not question:
+        return Response({'success': False, 'error': 'Missing q'}, status=400)
+    k = _bounded_int(request.query_params.get('k'), 5, 50)
+    try:
+        matches = tfidf.similar(question, k)
+    except tfidf.IndexNotBuilt:
+        return Response({'success': False, 'error': 'Index not built'}, status=503)
+    results = [{**KnowledgeBaseSerializer(entry).data, 'score': round(score, 4)} for entry, score in matches]
+    return Response({'results': results})
+
+class MetricsAccess(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.auth == 'metrics' or bool(request.user and request.user.is_staff)
+
+@api_view(['GET'])
+@authentication_classes([MetricsTokenAuthentication, CachedJWTAuthentication])
+@permission_classes([MetricsAccess])
+def metrics_endpoint(request):
+    return HttpResponse(metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_view(['GET'])
 def health_check(request):
     return Response({'status':'ok'})
@@ -0,0 +1,169 @@
+"""
+What-if GPA sessions held in the cache.
+
+A session starts as a copy of the user's courses plus per-semester and
+cumulative running totals on one grading scale. Each delta (add, change or
+remove one course) moves those totals by that course's contribution, so
+the new GPA and CGPA come back without re-reading or re-summing the
+transcript. Sessions expire ``WHATIF_SESSION_TIMEOUT`` seconds after their
+last use; concurrent deltas to one session are last-write-wins.
+"""
+import secrets
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import grading
+from .gpa import normalize_grade, summarize
+from .models import Course, parse_semester, semester_order
+from .totals import course_contribution
+
+# ``semester`` is a models.semester_order key, () for none; the grade and
+# credit attribute names match Course so totals.course_contribution applies
+Entry = namedtuple('Entry', 'semester letter_grade credits')
+OPS = ('add', 'change', 'remove')
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+class InvalidDelta(ValueError):
+    pass
+
+
+def _key(user_id, session_id):
+    return f'whatif:{user_id}:{session_id}'
+
+
+def _save(user_id, session_id, state):
+    cache.set(_key(user_id, session_id), state, settings.WHATIF_SESSION_TIMEOUT)
+
+
+def load(user_id, session_id):
+    state = cache.get(_key(user_id, session_id))
+    if state is None:
+        raise SessionNotFound(session_id)
+    return state
+
+
+def delete(user_id, session_id):
+    cache.delete(_key(user_id, session_id))
+
+
+def _move(state, scale, entry, sign):
+    points, credits = course_contribution(entry, scale)
+    for totals in (state['semesters'].setdefault(entry.semester, [Decimal(0), Decimal(0), 0]), state['total']):
+        totals[0] += sign * points
+        totals[1] += sign * credits
+        totals[2] += sign
+
+
+def _semester(state, text):
+    if text is not None and not isinstance(text, str):
+        raise InvalidDelta('semester_year must be a string')
+    parsed = parse_semester(text)
+    if parsed is None:
+        return ()
+    key = semester_order(*parsed)
+    state['labels'].setdefault(key, parsed[2])
+    return key
+
+
+def create(user, scale):
+    """Start a session from ``user``'s stored courses; returns ``(session_id, state)``."""
+    state = {'scale': scale.id, 'courses': {}, 'semesters': {}, 'labels': {}, 'total': [Decimal(0), Decimal(0), 0], 'added': 0}
+    for course_id, year, term, label, grade, credits in Course.objects.filter(user=user).values_list(
+            'id', 'semester__year', 'semester__term', 'semester__label', 'letter_grade', 'credits'):
+        key = () if label is None else semester_order(year, term, label)
+        if key:
+            state['labels'].setdefault(key, label)
+        entry = Entry(key, grade, credits)
+        state['courses'][str(course_id)] = entry
+        _move(state, scale, entry, 1)
+    session_id = secrets.token_urlsafe(12)
+    _save(user.id, session_id, state)
+    return session_id, state
+
+
+def _grade(value, scale):
+    grade = normalize_grade(value)
+    if grade not in scale.points:
+        raise InvalidDelta('Unknown grade')
+    return grade
+
+
+def _credits(value):
+    try:
+        credits = Decimal(str(value))
+    except ArithmeticError:
+        raise InvalidDelta('Invalid credits')
+    if not credits.is_finite() or not 0 < credits < 100:
+        raise InvalidDelta('Invalid credits')
+    return credits
+
+
+def apply(user_id, session_id, delta):
+    """
+    Apply one ``add``/``change``/``remove`` delta and return the changed
+    course key, the new state and the affected semesters.
+    """
+    if not isinstance(delta, dict):
+        raise InvalidDelta('Invalid data')
+    state = load(user_id, session_id)
+    scale = grading.get_scale(state['scale'])
+    op = delta.get('op')
+    if op not in OPS:
+        raise InvalidDelta(f"op must be one of {', '.join(OPS)}")
+    if op == 'add':
+        if len(state['courses']) >= settings.WHATIF_MAX_COURSES:
+            raise InvalidDelta('Too many courses')
+        state['added'] += 1
+        key = f"new-{state['added']}"
+        previous = None
+        entry = Entry(_semester(state, delta.get('semester_year')), _grade(delta.get('letter_grade'), scale), _credits(delta.get('credits')))
+    else:
+        key = str(delta.get('course'))
+        previous = state['courses'].get(key)
+        if previous is None:
+            raise InvalidDelta('Unknown course')
+        entry = None if op == 'remove' else Entry(
+            _semester(state, delta['semester_year']) if 'semester_year' in delta else previous.semester,
+            _grade(delta['letter_grade'], scale) if 'letter_grade' in delta else previous.letter_grade,
+            _credits(delta['credits']) if 'credits' in delta else previous.credits,
+        )
+
+    if previous is not None:
+        _move(state, scale, previous, -1)
+        del state['courses'][key]
+    if entry is not None:
+        _move(state, scale, entry, 1)
+        state['courses'][key] = entry
+    _save(user_id, session_id, state)
+    semesters = {course.semester for course in (previous, entry) if course is not None}
+    return key, state, sorted(semesters)
+
+
+def _row(state, semester, totals):
+    points, credits, count = totals
+    return {'semester_year': state['labels'].get(semester), 'points': points, 'credits': credits, 'courses': count}
+
+
+def summary(state, semesters=None):
+    """Payload for the whole session, or only for the given ``semesters``."""
+    if semesters is None:
+        rows = [_row(state, semester, totals) for semester, totals in sorted(state['semesters'].items()) if totals[2]]
+        courses = [
+            {'course': key, 'semester_year': state['labels'].get(entry.semester), 'letter_grade': entry.letter_grade, 'credits': float(entry.credits)}
+            for key, entry in state['courses'].items()
+        ]
+        return {**summarize(rows), 'courses': courses}
+    cumulative = summarize([_row(state, (), state['total'])])
+    return {
+        'cgpa': cumulative['cgpa'],
+        'total_credits': cumulative['total_credits'],
+        'course_count': cumulative['course_count'],
+        'semesters': summarize(_row(state, semester, state['semesters'][semester]) for semester in semesters)['semesters'],
+    }
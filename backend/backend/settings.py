@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # <--- CORS MUST BE FIRST
+    'accounts.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.ProfilingMiddleware',
 ]
 
 # ALLOW ALL ORIGINS
@@ -112,7 +114,7 @@ STATIC_URL = 'static/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -130,3 +132,68 @@ DJOSER = {
         'user': 'accounts.api.serializers.UserSerializer',
     }
 }
+
+# GPA batch endpoint
+GPA_BATCH_MAX_TRANSCRIPTS = int(os.getenv('GPA_BATCH_MAX_TRANSCRIPTS', 10000))
+
+# Seconds a worker trusts its compiled grading scales before rechecking for edits
+GRADING_SCALE_RECHECK = float(os.getenv('GRADING_SCALE_RECHECK', 5))
+
+# Target-CGPA planner: remaining courses per request and DP table width
+PLANNER_MAX_COURSES = int(os.getenv('PLANNER_MAX_COURSES', 120))
+PLANNER_MAX_STATES = int(os.getenv('PLANNER_MAX_STATES', 20000))
+
+# What-if sessions (/api/whatif/) live in the cache this long after their last edit
+WHATIF_SESSION_TIMEOUT = int(os.getenv('WHATIF_SESSION_TIMEOUT', 1800))
+WHATIF_MAX_COURSES = 500
+
+# Cache (multi-worker deployments need a shared cache such as Redis)
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Async read endpoints (accounts.async_views); enable when serving through backend.asgi
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# Request metrics (/api/metrics/); set METRICS_MULTIPROC_DIR when running several workers
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Opt-in request profiling (accounts.middleware.ProfilingMiddleware; browse with manage.py profiles)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'var', 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+
+# Admin changelists show the planner's row estimate for unfiltered tables at least this large
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000))
+
+# Knowledge base admin search shows at most this many of the best full-text matches
+ADMIN_SEARCH_LIMIT = int(os.getenv('ADMIN_SEARCH_LIMIT', 500))
+
+# Course list response cache
+COURSE_LIST_CACHE_TIMEOUT = int(os.getenv('COURSE_LIST_CACHE_TIMEOUT', 300))
+
+# Cached JWT user lookups; keep this well below the access token lifetime
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 300))
+
+# Bulk course import / export
+COURSE_IMPORT_BATCH_SIZE = int(os.getenv('COURSE_IMPORT_BATCH_SIZE', 1000))
+COURSE_IMPORT_MAX_BATCH_SIZE = 5000
+COURSE_IMPORT_MAX_ERRORS = 100
+COURSE_EXPORT_CHUNK_SIZE = int(os.getenv('COURSE_EXPORT_CHUNK_SIZE', 2000))
+
+# Chat cold storage
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', 180))
+
+# Knowledge base answer caches
+KNOWLEDGE_ANSWER_LRU_SIZE = int(os.getenv('KNOWLEDGE_ANSWER_LRU_SIZE', 1024))
+KNOWLEDGE_ANSWER_LRU_TTL = int(os.getenv('KNOWLEDGE_ANSWER_LRU_TTL', 60))
+KNOWLEDGE_ANSWER_CACHE_TIMEOUT = int(os.getenv('KNOWLEDGE_ANSWER_CACHE_TIMEOUT', 3600))
+KNOWLEDGE_INDEX_DIR = os.getenv('KNOWLEDGE_INDEX_DIR', os.path.join(BASE_DIR, 'var', 'knowledge_index'))
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import django
+
+
+def setup():
+    """Configure Django the same way manage.py does, ready for the test client."""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
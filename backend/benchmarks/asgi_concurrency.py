@@ -0,0 +1,164 @@
+"""
+Compare concurrent-connection throughput of the WSGI and ASGI deployments.
+
+Both modes run under gunicorn with the same worker count against a fresh
+SQLite database: sync workers serving backend.wsgi, and uvicorn workers
+serving backend.asgi with ASYNC_VIEWS=True. Active clients send requests
+back to back while idle clients, like mobile apps holding pre-opened
+connections, connect and wait ``--idle`` seconds before sending anything.
+A sync worker that accepts an idle connection is stuck until it speaks;
+an async worker keeps serving everyone else. Throughput and latency are
+reported for the active clients.
+
+Usage (from the backend directory):
+    python -m benchmarks.asgi_concurrency --clients 20 --idle-clients 50 --idle 1.0
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODES = {
+    'wsgi': (['backend.wsgi:application'], {'ASYNC_VIEWS': 'False'}),
+    'asgi': (['backend.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'], {'ASYNC_VIEWS': 'True'}),
+}
+PATHS = ('/api/health/', '/api/courses/', '/api/courses/summary/')
+
+
+def seed(courses):
+    """Migrate the benchmark database and return an access token for its user."""
+    from benchmarks import setup
+
+    setup()
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from accounts import totals
+    from accounts.models import Course, User
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(email='bench@example.com', username='bench', password='pass12345')
+    Course.objects.bulk_create(
+        Course(user=user, course_name=f'CRS{i:03}', credits=3, letter_grade='ABCDEF'[i % 6], semester_year=f'{2020 + i // 10} First')
+        for i in range(courses)
+    )
+    totals.rebuild_user(user.id, totals.expected_totals(Course.objects.filter(user=user)).get(user.id, {}))
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, workers, port, env):
+    app, extra_env = MODES[mode]
+    command = [sys.executable, '-m', 'gunicorn', *app, '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+               '--backlog', '2048', '--timeout', '120', '--log-level', 'warning']
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**env, **extra_env})
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+async def request(port, path, token, idle):
+    """One request on a fresh connection that sits idle before sending anything."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        await asyncio.sleep(idle)
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\nConnection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status = (await reader.readline()).split()[1]
+        await reader.read()
+        return status == b'200'
+    finally:
+        writer.close()
+
+
+async def client(port, token, idle, deadline, latencies, failures):
+    i = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(request(port, PATHS[i % len(PATHS)], token, idle), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            return
+        except (OSError, IndexError):
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start - idle)
+        else:
+            failures.append(1)
+        i += 1
+
+
+async def run_load(port, token, clients, idle_clients, idle, duration):
+    active, idle_done, failures = [], [], []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(client(port, token, 0, deadline, active, failures) for _ in range(clients)),
+        *(client(port, token, idle, deadline, idle_done, failures) for _ in range(idle_clients)),
+    )
+    return sorted(active), len(idle_done), len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=20, help='clients sending requests back to back')
+    parser.add_argument('--idle-clients', type=int, default=50, help='clients that hold a connection open before sending')
+    parser.add_argument('--idle', type=float, default=1.0, help='seconds an idle client waits before sending')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['wsgi', 'asgi'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'settings',
+            'DATABASE_URL': f'sqlite:///{Path(tmp) / "bench.sqlite3"}',
+            'ALLOWED_HOSTS': 'localhost,127.0.0.1',
+            'DEBUG': 'False',
+        }
+        os.environ.update(env)
+        token = seed(args.courses)
+
+        print(f'{args.clients} active + {args.idle_clients} idle clients ({args.idle:.1f}s idle), '
+              f'{args.workers} workers, {args.duration:.0f}s per mode')
+        for mode in args.modes:
+            port = free_port()
+            server = start_server(mode, args.workers, port, env)
+            try:
+                asyncio.run(run_load(port, token, args.workers, 0, 0, 1))  # warm up
+                latencies, idle_done, failed = asyncio.run(
+                    run_load(port, token, args.clients, args.idle_clients, args.idle, args.duration)
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            done = len(latencies)
+            p50 = statistics.median(latencies) if latencies else 0
+            p95 = latencies[max(int(done * 0.95) - 1, 0)] if latencies else 0
+            print(f'{mode}: {done / args.duration:7.1f} req/s, p50 {p50 * 1000:7.1f}ms, p95 {p95 * 1000:7.1f}ms, '
+                  f'idle clients served {idle_done}, failed {failed}')
+
+
+if __name__ == '__main__':
+    main()
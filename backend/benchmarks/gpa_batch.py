@@ -0,0 +1,70 @@
+"""
+Compare one batch request against looping over the single GPA endpoint.
+
+Usage (from the backend directory):
+    python -m benchmarks.gpa_batch --transcripts 2000 --courses 10
+"""
+import argparse
+import random
+import time
+
+from benchmarks import setup
+
+setup()
+
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+
+GRADES = ['A', 'B', 'C', 'D', 'E', 'F', 'b ', ' c']
+
+
+def make_transcripts(count, courses, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            'grades': [rng.choice(GRADES) for _ in range(courses)],
+            'credits': [rng.choice([1, 2, 3, 4]) for _ in range(courses)],
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transcripts', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Grading scales are read from the database; migration 0010 seeds the test database with the default 5.0 scale
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        client = APIClient()
+        # Unsaved user: force_authenticate skips the user lookup
+        client.force_authenticate(user=User(id=1, email='bench@example.com', username='bench'))
+        transcripts = make_transcripts(args.transcripts, args.courses, args.seed)
+
+        start = time.perf_counter()
+        single = [client.post('/api/calculate-gpa/', t, format='json').json() for t in transcripts]
+        single_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = client.post('/api/calculate-gpa/batch/', {'transcripts': transcripts}, format='json').json()
+        batch_elapsed = time.perf_counter() - start
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    mismatches = sum(
+        1 for one, many in zip(single, batch['results'])
+        if one.get('gpa') != many.get('gpa')
+    )
+    print(f'{args.transcripts} transcripts x {args.courses} courses')
+    print(f'single endpoint loop: {single_elapsed:.3f}s ({args.transcripts / single_elapsed:.0f} transcripts/s)')
+    print(f'batch endpoint:       {batch_elapsed:.3f}s ({args.transcripts / batch_elapsed:.0f} transcripts/s)')
+    print(f'speedup: {single_elapsed / batch_elapsed:.1f}x, mismatched results: {mismatches}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+In-process benchmark suite for the main API flows.
+
+Each scenario runs through the Django test client against a throwaway test
+database, with the full middleware and JWT authentication stack. For every
+scenario the suite checks the response status and reports p50/p95/p99
+latency, throughput and SQL queries per request. ``--save-baseline`` writes
+the results to a JSON file; later runs compare against it and exit non-zero
+when a latency percentile regresses by more than ``--threshold`` or a
+scenario issues more queries than before. Baselines are machine specific,
+so record one on the machine that runs the comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --threshold 0.25 --scenarios course_list summary
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+from benchmarks import setup
+
+setup()
+
+import django  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from accounts.models import Course, User  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+PASSWORD = 'BenchPass123!'
+SCENARIOS = {}
+
+
+def scenario(name, status, hashes_password=False):
+    """Register ``func(bench, count)``, which prepares untimed state and returns ``request(i)``."""
+    def register(func):
+        SCENARIOS[name] = (func, status, hashes_password)
+        return func
+    return register
+
+
+class Bench:
+    def __init__(self):
+        self.user = User.objects.create_user(email='bench@example.com', username='bench', password=PASSWORD)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.anonymous = APIClient()
+
+    def courses(self, count):
+        courses = Course.objects.bulk_create(
+            Course(user=self.user, course_name=f'CRS{i:04}', credits=3, letter_grade='ABCDEF'[i % 6], semester_year=f'{2020 + i % 4} First')
+            for i in range(count)
+        )
+        # Link semesters and build totals, as rows written through the API would have them
+        call_command('rebuild_gpa_totals', '--user', self.user.id, stdout=StringIO())
+        return courses
+
+
+@scenario('register', 201, hashes_password=True)
+def register(bench, count):
+    return lambda i: bench.anonymous.post(
+        '/api/register/', {'email': f'user{i}@bench.test', 'username': f'user{i}', 'password': PASSWORD}, format='json'
+    )
+
+
+@scenario('login', 200, hashes_password=True)
+def login(bench, count):
+    return lambda i: bench.anonymous.post('/api/login/', {'email': bench.user.email, 'password': PASSWORD}, format='json')
+
+
+@scenario('token_refresh', 200)
+def token_refresh(bench, count):
+    return lambda i: bench.anonymous.post('/api/token/refresh/', {'refresh': str(bench.refresh)}, format='json')
+
+
+@scenario('course_create', 201)
+def course_create(bench, count):
+    return lambda i: bench.client.post(
+        '/api/courses/', {'course_name': f'NEW{i:04}', 'credits': 3, 'letter_grade': 'B', 'semester_year': '2024 First'}, format='json'
+    )
+
+
+@scenario('course_list', 200)
+def course_list(bench, count):
+    return lambda i: bench.client.get('/api/courses/')
+
+
+@scenario('course_update', 200)
+def course_update(bench, count):
+    courses = bench.courses(count)
+    return lambda i: bench.client.patch(f'/api/courses/{courses[i].id}/', {'letter_grade': 'A'}, format='json')
+
+
+@scenario('course_delete', 204)
+def course_delete(bench, count):
+    courses = bench.courses(count)
+    return lambda i: bench.client.delete(f'/api/courses/{courses[i].id}/')
+
+
+@scenario('summary', 200)
+def summary(bench, count):
+    return lambda i: bench.client.get('/api/courses/summary/')
+
+
+@scenario('trajectory', 200)
+def trajectory(bench, count):
+    return lambda i: bench.client.get('/api/courses/trajectory/')
+
+
+@scenario('calculate_gpa', 200)
+def calculate_gpa(bench, count):
+    payload = {'grades': ['A', 'B', 'C', 'A', 'D', 'B'], 'credits': [3, 3, 2, 4, 1, 2]}
+    return lambda i: bench.client.post('/api/calculate-gpa/', payload, format='json')
+
+
+@scenario('gpa_plan', 200)
+def gpa_plan(bench, count):
+    payload = {'grades': ['B'] * 20, 'credits': [3] * 20, 'remaining_credits': [3, 2, 4, 1, 3, 6] * 10, 'target': 4.3}
+    return lambda i: bench.client.post('/api/gpa-plan/', payload, format='json')
+
+
+def run_scenario(bench, name, iterations, warmup):
+    func, expected, _ = SCENARIOS[name]
+    request = func(bench, warmup + iterations)
+    latencies, queries, failures = [], [], []
+    for i in range(warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request(i)
+            elapsed = time.perf_counter() - start
+        if response.status_code != expected:
+            failures.append(f'{name}: expected {expected}, got {response.status_code}')
+        if i >= warmup:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'iterations': iterations,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'throughput_rps': round(iterations / sum(latencies), 1),
+        'queries': round(statistics.mean(queries), 2),
+    }, failures[:3]
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if result[key] > base[key] * (1 + threshold):
+                found.append(f'{name}: {key} {result[key]} vs baseline {base[key]} (+{result[key] / base[key] - 1:.0%})')
+        if result['queries'] > base['queries']:
+            found.append(f'{name}: {result["queries"]} queries per request vs baseline {base["queries"]}')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--hash-iterations', type=int, default=10,
+                        help='Iterations for register and login, which are dominated by password hashing.')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline.')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative latency regression.')
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        bench = Bench()
+        results, failures = {}, []
+        print(f'{"scenario":15} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"queries":>8}')
+        for name in args.scenarios:
+            iterations = args.hash_iterations if SCENARIOS[name][2] else args.iterations
+            results[name], failed = run_scenario(bench, name, iterations, args.warmup)
+            failures += failed
+            r = results[name]
+            print(f'{name:15} {r["p50_ms"]:9.2f} {r["p95_ms"]:9.2f} {r["p99_ms"]:9.2f} {r["throughput_rps"]:8.1f} {r["queries"]:8.2f}')
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    if failures:
+        print('\nUnexpected responses:\n  ' + '\n  '.join(failures))
+        sys.exit(1)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({
+            'environment': {'python': platform.python_version(), 'django': django.get_version(), 'machine': platform.machine()},
+            'scenarios': results,
+        }, indent=2) + '\n')
+        print(f'\nBaseline saved to {args.baseline}')
+    elif args.baseline.exists():
+        found = regressions(results, json.loads(args.baseline.read_text())['scenarios'], args.threshold)
+        if found:
+            print(f'\nRegressions beyond {args.threshold:.0%}:\n  ' + '\n  '.join(found))
+            sys.exit(1)
+        print(f'\nNo regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -73,7 +75,7 @@ else:
 # ==================== REST & AUTH ====================
 AUTH_USER_MODEL = 'accounts.User'
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('accounts.authentication.CachedJWTAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
 }
 
@@ -82,6 +84,25 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# ==================== ASGI ====================
+# Serve the hot read endpoints from accounts.async_views (run under uvicorn workers)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# ==================== METRICS ====================
+# /api/metrics/ accepts staff users or `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Shared directory for merging metrics across gunicorn workers; empty it on deploy
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# ==================== PROFILING ====================
+# Opt-in cProfile of requests sending X-Profile (secret or staff) or sampled at PROFILE_SAMPLE_RATE
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'backend', 'var', 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+
 # ==================== STATIC & CORS ====================
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
@@ -109,3 +130,54 @@ LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
+
+# ==================== ADMIN ====================
+# Unfiltered changelists of tables at least this large show the planner's row estimate
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000))
+# Knowledge base admin search shows at most this many of the best full-text matches
+ADMIN_SEARCH_LIMIT = int(os.getenv('ADMIN_SEARCH_LIMIT', 500))
+
+# ==================== GPA ====================
+GPA_BATCH_MAX_TRANSCRIPTS = int(os.getenv('GPA_BATCH_MAX_TRANSCRIPTS', 10000))
+# Seconds a worker trusts its compiled grading scales before rechecking for edits
+GRADING_SCALE_RECHECK = float(os.getenv('GRADING_SCALE_RECHECK', 5))
+# Target-CGPA planner: remaining courses per request and DP table width
+PLANNER_MAX_COURSES = int(os.getenv('PLANNER_MAX_COURSES', 120))
+PLANNER_MAX_STATES = int(os.getenv('PLANNER_MAX_STATES', 20000))
+# What-if sessions (/api/whatif/) live in the cache this long after their last edit
+WHATIF_SESSION_TIMEOUT = int(os.getenv('WHATIF_SESSION_TIMEOUT', 1800))
+WHATIF_MAX_COURSES = 500
+
+# ==================== CACHING ====================
+# Multi-worker deployments need a shared cache so per-user version stamps agree
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+COURSE_LIST_CACHE_TIMEOUT = int(os.getenv('COURSE_LIST_CACHE_TIMEOUT', 300))
+# Cached JWT user lookups; keep this well below the access token lifetime
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 300))
+
+# ==================== BULK IMPORT / EXPORT ====================
+COURSE_IMPORT_BATCH_SIZE = int(os.getenv('COURSE_IMPORT_BATCH_SIZE', 1000))
+COURSE_IMPORT_MAX_BATCH_SIZE = 5000
+COURSE_IMPORT_MAX_ERRORS = 100
+COURSE_EXPORT_CHUNK_SIZE = int(os.getenv('COURSE_EXPORT_CHUNK_SIZE', 2000))
+
+# ==================== CHAT ====================
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', 180))
+
+# ==================== KNOWLEDGE BASE ====================
+KNOWLEDGE_ANSWER_LRU_SIZE = int(os.getenv('KNOWLEDGE_ANSWER_LRU_SIZE', 1024))
+KNOWLEDGE_ANSWER_LRU_TTL = int(os.getenv('KNOWLEDGE_ANSWER_LRU_TTL', 60))
+KNOWLEDGE_ANSWER_CACHE_TIMEOUT = int(os.getenv('KNOWLEDGE_ANSWER_CACHE_TIMEOUT', 3600))
+KNOWLEDGE_INDEX_DIR = os.getenv('KNOWLEDGE_INDEX_DIR', os.path.join(BASE_DIR, 'backend', 'var', 'knowledge_index'))